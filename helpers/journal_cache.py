@@ -0,0 +1,183 @@
+import json
+import threading
+from pathlib import Path
+from os.path import dirname
+from typing import Optional
+from helpers.logger_factory import logger
+
+_cache_version = 4
+_cache_location = Path(dirname(__file__)).parent.joinpath("journal_cache")
+# Versions before 3 kept the whole Cache in a single file
+_legacy_cache_location = Path(dirname(__file__)).parent.joinpath("journal_cache.json")
+
+class JournalCache:
+    """
+    Persistent store of the mission relevant events already extracted from each journal file.
+    Every file is keyed by its name and fingerprinted by size, mtime and the byte offset parsing stopped at,
+    so unchanged files can be skipped and appended files only need parsing from their last offset.
+    The fingerprints are kept in a small index and the events of every file in a file of their own. Loading only reads
+    the index, the events of a file are read once they are asked for, and saving only writes the files that changed.
+    Next to its fingerprint the index holds a summary of every file, which is enough to decide whether the file is needed.
+    """
+
+    def __init__(self, location: Path):
+        self.location = location
+        # file name -> size, mtime, offset, cmdr and summary of the file
+        self.files: dict[str, dict] = {}
+        # The Commander of a file never changes, so this is kept even for files whose events are not cached
+        self.commanders: dict[str, Optional[str]] = {}
+        self.events: list[str] = []
+        # Events put since the last save, by file name. Written and dropped by save
+        self._changed_events: dict[str, list[dict]] = {}
+        # Files whose events are to be deleted by the next save
+        self._removed: set[str] = set()
+        self.loaded = False
+        self.changed = False
+        # Files may be parsed on several worker threads at once
+        self.lock = threading.Lock()
+
+    def __get_index_path(self) -> Path:
+        return self.location.joinpath("index.json")
+
+    def __get_events_path(self, file_name: str) -> Path:
+        # Journal names only hold letters, digits, dots, dashes and a T, so they are safe as they are
+        return self.location.joinpath(file_name + ".json")
+
+    def load(self, events: set[str]):
+        if self.loaded and self.events == sorted(events):
+            return
+        self.loaded = True
+        self.files = {}
+        self.commanders = {}
+        self._changed_events = {}
+        self.events = sorted(events)
+        if _legacy_cache_location.is_file():
+            logger.info("Journal Cache moved to one file per Journal. Discarding the old one...")
+            _legacy_cache_location.unlink(missing_ok=True)
+        if not self.__get_index_path().is_file():
+            return
+        try:
+            with open(self.__get_index_path(), "r", encoding="utf8") as index_file:
+                data = json.load(index_file)
+            if data.get("version") != _cache_version:
+                logger.info("Journal Cache version changed. Discarding...")
+                return
+            self.commanders = data["commanders"]
+            if data.get("events") != self.events:
+                # Cached files only hold the events subscribed at the time they were parsed
+                logger.info("Subscribed Journal Events changed. Discarding Journal Cache...")
+                self._removed.update(data["files"].keys())
+                self.changed = True
+                return
+            self.files = data["files"]
+            logger.info(f"Loaded Journal Cache index with {len(self.files)} Files")
+        except Exception as ex:
+            logger.warning(f"Error Occurred: {ex}\nFailed to load Journal Cache {self.location}. Ignoring...")
+            self.files = {}
+            self.commanders = {}
+
+    def save(self):
+        if not self.changed:
+            return
+        with self.lock:
+            changed_events = self._changed_events
+            self._changed_events = {}
+            removed = self._removed
+            self._removed = set()
+            index = {"version": _cache_version, "events": self.events, "commanders": dict(self.commanders), "files": dict(self.files)}
+            self.changed = False
+        try:
+            self.location.mkdir(exist_ok=True)
+            # The events go first. Each carries the offset it was parsed up to, which get_events checks against the index
+            for file_name, events in changed_events.items():
+                fingerprint = index["files"].get(file_name)
+                if fingerprint is not None:
+                    self.__write(self.__get_events_path(file_name), {"offset": fingerprint["offset"], "events": events})
+            for file_name in removed:
+                self.__get_events_path(file_name).unlink(missing_ok=True)
+            self.__write(self.__get_index_path(), index)
+        except Exception as ex:
+            logger.warning(f"Error Occurred: {ex}\nFailed to save Journal Cache {self.location}. Ignoring...")
+            with self.lock:
+                # Kept for the next save, unless the files were changed again in the meantime
+                self._changed_events = {**changed_events, **self._changed_events}
+                self._removed.update(removed)
+                self.changed = True
+
+    @staticmethod
+    def __write(path: Path, data: dict):
+        temp_path = path.with_suffix(".tmp")
+        with open(temp_path, "w", encoding="utf8") as cache_file:
+            json.dump(data, cache_file, separators=(",", ":"))
+        temp_path.replace(path)
+
+    def get(self, file_name: str) -> Optional[dict]:
+        """
+        Fingerprint of the file, without its events.
+        """
+        return self.files.get(file_name)
+
+    def get_summary(self, file_name: str) -> Optional[dict]:
+        fingerprint = self.files.get(file_name)
+        return fingerprint.get("summary") if fingerprint is not None else None
+
+    def get_events(self, file_name: str) -> Optional[list[dict]]:
+        """
+        Cached events of the file, None if they cannot be read or do not match its fingerprint.
+        """
+        events = self._changed_events.get(file_name)
+        if events is not None:
+            return events
+        fingerprint = self.files.get(file_name)
+        if fingerprint is None:
+            return None
+        try:
+            with open(self.__get_events_path(file_name), "r", encoding="utf8") as events_file:
+                data = json.load(events_file)
+            if data.get("offset") != fingerprint["offset"]:
+                return None
+            return data["events"]
+        except Exception as ex:
+            logger.warning(f"Error Occurred: {ex}\nFailed to load cached Events of {file_name}. Ignoring...")
+            return None
+
+    def put(self, file_name: str, size: int, mtime: int, offset: int, cmdr: Optional[str], events: list[dict], summary: dict):
+        with self.lock:
+            self.files[file_name] = {
+                "size": size,
+                "mtime": mtime,
+                "offset": offset,
+                "cmdr": cmdr,
+                "summary": summary
+            }
+            self._changed_events[file_name] = events
+            self._removed.discard(file_name)
+            if cmdr is not None:
+                self.commanders[file_name] = cmdr
+            self.changed = True
+
+    def get_commander(self, file_name: str) -> Optional[str]:
+        return self.commanders.get(file_name)
+
+    def has_commander(self, file_name: str) -> bool:
+        return file_name in self.commanders
+
+    def put_commander(self, file_name: str, cmdr: Optional[str]):
+        with self.lock:
+            self.commanders[file_name] = cmdr
+            self.changed = True
+
+    def prune(self, file_names: set[str]):
+        with self.lock:
+            for file_name in list(self.files.keys()):
+                if file_name not in file_names:
+                    del self.files[file_name]
+                    self._changed_events.pop(file_name, None)
+                    self._removed.add(file_name)
+                    self.changed = True
+            for file_name in list(self.commanders.keys()):
+                if file_name not in file_names:
+                    del self.commanders[file_name]
+                    self.changed = True
+
+journal_cache = JournalCache(_cache_location)
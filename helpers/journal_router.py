@@ -0,0 +1,44 @@
+from typing import Callable, Iterable
+from helpers.logger_factory import logger
+
+class JournalRouter:
+    """
+    Maps Journal Event names to the handlers subscribed to them. Events nobody subscribed to cost a single dict miss.
+    Handler: (cmdr, event) -> void
+    """
+
+    def __init__(self):
+        self._routes: dict[str, list[Callable[[str, dict], None]]] = {}
+
+    @property
+    def event_names(self) -> set[str]:
+        return set(self._routes.keys())
+
+    def is_subscribed(self, event_name: str) -> bool:
+        return event_name in self._routes
+
+    def subscribe(self, event_names: Iterable[str], handler: Callable[[str, dict], None]):
+        for event_name in event_names:
+            self._routes.setdefault(event_name, []).append(handler)
+
+    def unsubscribe(self, event_names: Iterable[str], handler: Callable[[str, dict], None]):
+        for event_name in event_names:
+            handlers = self._routes.get(event_name, [])
+            if handler in handlers:
+                handlers.remove(handler)
+            if len(handlers) == 0:
+                self._routes.pop(event_name, None)
+
+    def route(self, cmdr: str, event: dict) -> bool:
+        handlers = self._routes.get(event["event"])
+        if handlers is None:
+            return False
+        for handler in handlers:
+            try:
+                handler(cmdr, event)
+            except Exception as ex:
+                logger.warning(f"Error Occurred: {ex}\nFailed to process {event['event']} Event. Skipping...")
+        return True
+
+# Live Journal Events delivered by EDMC through journal_entry
+journal_router = JournalRouter()
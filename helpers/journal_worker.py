@@ -0,0 +1,57 @@
+import queue
+import threading
+from typing import Callable, Optional
+from helpers.logger_factory import logger
+from helpers.journal_router import JournalRouter, journal_router
+
+class JournalWorker:
+    """
+    Applies the live Journal Events on a dedicated Thread, so journal_entry only has to queue them and return.
+    Anything else changing the Mission Repository is submitted to the same queue, which makes this Thread its only writer.
+    The Change Sets of the MissionChangeCoalescer are emitted here as well, the listeners dispatch what the UI needs to the Tk Thread.
+    """
+
+    def __init__(self, router: JournalRouter):
+        self._router = router
+        # (callback, args), None stops the Thread
+        self._queue: queue.SimpleQueue[Optional[tuple[Callable, tuple]]] = queue.SimpleQueue()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self.__run, name="EDMC-Missions Journal Worker", daemon=True)
+        self._thread.start()
+
+    def enqueue(self, cmdr: str, event: dict):
+        # Events nobody subscribed to are dropped right away rather than waking the Thread
+        if self._router.is_subscribed(event["event"]):
+            self._queue.put((self._router.route, (cmdr, event)))
+
+    def submit(self, callback: Callable[[], None]):
+        self._queue.put((callback, ()))
+
+    def __run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            callback, args = item
+            try:
+                callback(*args)
+            except Exception as ex:
+                logger.error("Journal Worker callback failed", exc_info=ex)
+
+    def stop(self, timeout: float = 5.0):
+        """
+        Applies everything queued so far and ends the Thread.
+        """
+        if self._thread is None:
+            return
+        self._queue.put(None)
+        self._thread.join(timeout)
+        if self._thread.is_alive():
+            logger.warning("Journal Worker did not finish in time")
+        self._thread = None
+
+journal_worker = JournalWorker(journal_router)
@@ -1,8 +1,22 @@
+import os
+import re
+import calendar
 import json
+import mmap
 import datetime as dt
+import threading
+from typing import Callable, Iterable, Iterator, Optional
+from dataclasses import dataclass
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from config import config
 from helpers.logger_factory import logger
+from helpers.journal_cache import journal_cache
+from helpers.journal_router import JournalRouter
+from missions.archive import mission_archive
+from missions.index import BountyIndex, build_bounty_index
+from missions.persistence import RestoredMissions, repository_log, skip_applied_events
+from missions.records import MissionRecord
 from datetime import datetime, timedelta
 
 file_location: str
@@ -15,76 +29,524 @@ if file_location is None or file_location == "":
     file_location = config.default_journal_dir
 
 
-def get_logs_after_timestamp(timestamp: dt.date) -> list[Path]:
-    logs_after_timestamp = []
+_journal_name_pattern = re.compile(r"^Journal(?:Beta)?\.(\d{4}-\d{2}-\d{2}T\d{6}|\d{12})\.(\d{2})\.log$")
 
-    for log_file in Path(file_location).glob("*.log"):
-        if not log_file.is_file():
+def get_journal_timestamp(file_name: str) -> Optional[tuple[datetime, int]]:
+    match = _journal_name_pattern.match(file_name)
+    if match is None:
+        return None
+    # Journals were named Journal.YYMMDDHHMMSS.NN.log before Odyssey, Journal.YYYY-MM-DDTHHMMSS.NN.log since
+    if "-" in match.group(1):
+        timestamp = datetime.strptime(match.group(1), "%Y-%m-%dT%H%M%S")
+    else:
+        timestamp = datetime.strptime(match.group(1), "%y%m%d%H%M%S")
+    return timestamp, int(match.group(2))
+
+def iter_journal_files(timestamp: dt.date, newest_first: bool = False) -> Iterator[Path]:
+    """
+    Yields the Journals started on or after timestamp in the order they were written.
+    The order and the cut-off both come from the file name, so no file has to be stat'ed.
+    """
+    journals: list[tuple[tuple[datetime, int], str]] = []
+    try:
+        with os.scandir(file_location) as entries:
+            for entry in entries:
+                journal_timestamp = get_journal_timestamp(entry.name)
+                if journal_timestamp is None or journal_timestamp[0].date() < timestamp or not entry.is_file():
+                    continue
+                journals.append((journal_timestamp, entry.name))
+    except OSError as ex:
+        logger.warning(f"Error Occurred: {ex}\nFailed to read the Journal directory {file_location}. Skipping...")
+        return
+
+    journals.sort(reverse=newest_first)
+    logger.debug(f"Found {len(journals)} Logs for all CMDRs")
+    for _, file_name in journals:
+        yield Path(file_location, file_name)
+
+# Only lines whose event name is in here get decoded. Whoever consumes journal events registers what they need
+# through subscribe_journal_events, everything else (FSDJump, Music, ReceiveText, ...) is skipped before json.loads.
+journal_event_subscriptions: set[str] = set()
+
+_event_name_pattern = re.compile(rb'"event"\s*:\s*"([^"]+)"')
+_journal_header_size = 4096
+
+def subscribe_journal_events(events: Iterable[str]):
+    journal_event_subscriptions.update(events)
+
+@dataclass
+class JournalFile:
+    path: Path
+    cmdr: Optional[str]
+    events: list[dict]
+
+def summarize_journal_events(events: list[dict]) -> dict:
+    """
+    What scan_journal_files needs to know of a Journal: the MissionIDs accepted in it, those its last Missions Event lists,
+    and the Massacre Missions any of its Missions Events list.
+    """
+    accepted: list[int] = []
+    active: Optional[list[int]] = None
+    listed_massacres: set[int] = set()
+    for event in events:
+        if event["event"] == "Missions":
+            active = list(map(lambda x: int(x["MissionID"]), event["Active"]))
+            # Without a Name the Mission may be a Massacre Mission as well
+            listed_massacres.update(int(x["MissionID"]) for x in event["Active"] if x.get("Name", "Mission_Massacre").startswith("Mission_Massacre"))
+        elif event["event"] == "MissionAccepted":
+            accepted.append(event["MissionID"])
+    return {"accepted": accepted, "active": active, "listed_massacres": sorted(listed_massacres)}
+
+def is_journal_cached(file_path: Path) -> bool:
+    file_stat = file_path.stat()
+    cached = journal_cache.get(file_path.name)
+    return cached is not None and cached["size"] == file_stat.st_size and cached["mtime"] == file_stat.st_mtime_ns
+
+def __read_journal_lines(journal: mmap.mmap, file_path: Path, offset: int, cmdr: Optional[str], events: list[dict]) -> tuple[int, Optional[str]]:
+    subscribed_event_names = set(map(lambda x: x.encode("utf8"), journal_event_subscriptions))
+    # Only complete lines are consumed. If the game is still writing the last one it is picked up on the next start
+    end = journal.rfind(b"\n") + 1
+    position = offset
+    while position < end:
+        line_end = journal.find(b"\n", position, end) + 1
+        # Everything up to here works on the mapped bytes, only lines for subscribed events get copied and decoded
+        match = _event_name_pattern.search(journal, position, line_end)
+        if match is not None and match.group(1) in subscribed_event_names:
+            try:
+                event = json.loads(journal[position:line_end])
+                if event["event"] == "Commander" and cmdr is None:
+                    cmdr = str(event["Name"])
+                events.append(event)
+            except Exception as ex:
+                logger.warning(f"Error Occurred: {ex}\nFailed to process journal {file_path}. Skipping...")
+        position = line_end
+
+    return max(offset, end), cmdr
+
+def read_journal_file(file_path: Path) -> JournalFile:
+    file_stat = file_path.stat()
+    cached = journal_cache.get(file_path.name)
+    cached_events = journal_cache.get_events(file_path.name) if cached is not None else None
+    if cached_events is not None and cached["size"] == file_stat.st_size and cached["mtime"] == file_stat.st_mtime_ns:
+        return JournalFile(file_path, cached.get("cmdr"), cached_events)
+
+    offset = 0
+    cmdr = None
+    events = []
+    if cached_events is not None and cached["offset"] <= file_stat.st_size:
+        # The game only ever appends to a journal, so everything up to the stored offset is still valid
+        offset = cached["offset"]
+        cmdr = cached.get("cmdr")
+        # Copied, the cached list may still be waiting to be saved
+        events = list(cached_events)
+
+    if file_stat.st_size > offset:
+        with open(file_path, "rb") as current_log_file:
+            with mmap.mmap(current_log_file.fileno(), file_stat.st_size, access=mmap.ACCESS_READ) as journal:
+                offset, cmdr = __read_journal_lines(journal, file_path, offset, cmdr, events)
+
+    journal_cache.put(file_path.name, file_stat.st_size, file_stat.st_mtime_ns, offset, cmdr, events, summarize_journal_events(events))
+    return JournalFile(file_path, cmdr, events)
+
+def read_journal_files(log_files: list[Path], worker_count: int) -> list[JournalFile]:
+    changed_files = [log_file for log_file in log_files if not is_journal_cached(log_file)]
+    parsed_files: dict[Path, JournalFile] = {}
+
+    if worker_count > 1 and len(changed_files) > 1:
+        # Threads rather than processes: EDMC is a frozen executable, so spawning interpreters is not an option.
+        # File reads and the line scan in between decodes still overlap well enough.
+        logger.info(f"Parsing {len(changed_files)} changed Journals with {worker_count} Workers")
+        with ThreadPoolExecutor(max_workers=worker_count, thread_name_prefix="EDMC-Missions Journal") as executor:
+            for journal_file in executor.map(read_journal_file, changed_files):
+                parsed_files[journal_file.path] = journal_file
+
+    # Merge in chronological order, the Mission progress has to be replayed in the same sequence it happened in
+    journal_files = []
+    for log_file in log_files:
+        journal_file = parsed_files.get(log_file)
+        if journal_file is None:
+            journal_file = read_journal_file(log_file)
+        journal_files.append(journal_file)
+    return journal_files
+
+def read_journal_commander(file_path: Path) -> Optional[str]:
+    if journal_cache.has_commander(file_path.name):
+        return journal_cache.get_commander(file_path.name)
+
+    cmdr = None
+    with open(file_path, "rb") as current_log_file:
+        header = current_log_file.read(_journal_header_size)
+    # The Commander (or LoadGame) Event is written right after the Fileheader, so only the top of the file is needed
+    for line in header.split(b"\n")[:-1]:
+        match = _event_name_pattern.search(line)
+        if match is None or match.group(1) not in [b"Commander", b"LoadGame"]:
             continue
-        if timestamp < dt.datetime.fromtimestamp(log_file.stat().st_mtime, tz=dt.timezone.utc).date():
-            logs_after_timestamp.append(log_file)
-    logger.debug(f"Loaded {len(logs_after_timestamp)} Logs for all CMDRs")
-    return logs_after_timestamp
+        try:
+            event = json.loads(line)
+            cmdr = str(event["Name"] if event["event"] == "Commander" else event["Commander"])
+            break
+        except Exception as ex:
+            logger.warning(f"Error Occurred: {ex}\nFailed to process journal {file_path}. Skipping...")
+
+    if cmdr is not None:
+        journal_cache.put_commander(file_path.name, cmdr)
+    return cmdr
+
+def index_journal_commanders(log_files: list[Path]) -> dict[Path, Optional[str]]:
+    """
+    Maps each Journal (given newest first) to its Commander. Journals continuing a session (part 2 onwards)
+    have no Commander Event of their own and belong to the Commander of the part before them.
+    """
+    commanders: dict[Path, Optional[str]] = {}
+    cmdr = None
+    for log_file in reversed(log_files):
+        file_cmdr = read_journal_commander(log_file)
+        if file_cmdr is not None:
+            cmdr = file_cmdr
+        elif get_journal_timestamp(log_file.name)[1] == 1:
+            # A new session that never got past the main menu
+            cmdr = None
+        commanders[log_file] = cmdr
+    return commanders
+
+def get_latest_commander(timestamp: dt.date) -> Optional[str]:
+    journal_cache.load(journal_event_subscriptions)
+    for log_file in iter_journal_files(timestamp, newest_first=True):
+        cmdr = read_journal_commander(log_file)
+        if cmdr is not None:
+            return cmdr
+    return None
+
+def read_journal_summaries(log_files: list[Path], worker_count: int) -> dict[Path, dict]:
+    """
+    Summaries of the Journals, see summarize_journal_events. Cached Journals are summarized by the index alone,
+    the others are parsed and only their summary is kept.
+    """
+    summaries: dict[Path, dict] = {}
+    for log_file in log_files:
+        summary = journal_cache.get_summary(log_file.name) if is_journal_cached(log_file) else None
+        if summary is not None:
+            summaries[log_file] = summary
+    changed_files = [log_file for log_file in log_files if log_file not in summaries]
+    for journal_file in read_journal_files(changed_files, worker_count):
+        summaries[journal_file.path] = summarize_journal_events(journal_file.events)
+    return summaries
+
+def scan_journal_files(log_files: list[Path], cmdr: str, worker_count: int, progress: Optional[Callable[[int, int], None]] = None, cancel: Optional[threading.Event] = None) -> list[Path]:
+    """
+    Walks the Journals of cmdr (given newest first) until each MissionID in its latest Missions Event has a MissionAccepted.
+    Bounties are credited to the oldest Massacre Mission of a Faction first, so a Massacre Mission finished since still
+    takes kills from the active ones. Each Massacre Mission listed by the Missions Event of a Journal walked has to be
+    found as well, which may lead further back. Only the summaries of the Journals are looked at, no Events are kept. The Journals needed are returned oldest first,
+    so the progress of those Missions can be replayed in the order it happened, see load_journal_events.
+    """
+    commanders = index_journal_commanders(log_files)
+    cmdr_files = [log_file for log_file in log_files if commanders[log_file] == cmdr]
+
+    active_uuids: Optional[set[int]] = None
+    # Massacre Missions listed by the Missions Events of the Journals walked, see above
+    listed_uuids: set[int] = set()
+    accepted_uuids: set[int] = set()
+    needed_files: list[Path] = []
+
+    batch_size = max(worker_count, 1)
+    for batch_start in range(0, len(cmdr_files), batch_size):
+        if cancel is not None and cancel.is_set():
+            logger.info("Loading Journals cancelled")
+            return []
+        if progress is not None:
+            progress(batch_start, len(cmdr_files))
 
-def get_cmdr_missions(timestamp: dt.date) -> dict[str, dict[int, dict]]:
+        batch_files = cmdr_files[batch_start:batch_start + batch_size]
+        summaries = read_journal_summaries(batch_files, worker_count)
+        for log_file in batch_files:
+            summary = summaries[log_file]
+            needed_files.append(log_file)
+            accepted_uuids.update(summary["accepted"])
+            listed_uuids.update(summary["listed_massacres"])
+            # Only the last Missions Event of the newest Journal that has one decides which Missions are active
+            if active_uuids is None and summary["active"] is not None:
+                active_uuids = set(summary["active"])
+
+        if active_uuids is not None and active_uuids <= accepted_uuids and listed_uuids <= accepted_uuids:
+            break
+
+    if progress is not None:
+        progress(len(cmdr_files), len(cmdr_files))
+    logger.info(f"Resolved active Missions for CMDR {cmdr} reading {len(needed_files)} of {len(cmdr_files)} Logs ({len(log_files)} for all CMDRs)")
+    needed_files.reverse()
+    return needed_files
+
+def iter_journal_events(journal_files: Iterable[JournalFile]) -> Iterator[tuple[str, dict]]:
     cmdr = ""
-    cmdr_events = {}
-
-    for file_path in get_logs_after_timestamp(timestamp):
-        with open(file_path, "r", encoding="utf8") as current_log_file:
-            line = current_log_file.readline()
-            while line != "":
-                try:
-                    event = json.loads(line)
-                    if event["event"] == "Commander":                        
-                        cmdr = str(event["Name"])
-                        if cmdr not in cmdr_events.keys():
-                            cmdr_events[cmdr] = {}
-                            
-                    elif event["event"] == "MissionAccepted":                        
-                        cmdr_events[cmdr][event["MissionID"]] = event
-                        
-                    elif event["event"] == "CargoDepot" and event["UpdateType"] == "Deliver":                        
-                        populate_missions_cargodepot(event, cmdr_events[cmdr])
-                            
-                    elif event["event"] == "Bounty":                        
-                        populate_missions_bounty(event, cmdr_events[cmdr])
-
-                except Exception as ex:
-                    logger.warning(f"Error Occurred: {ex}\nFailed to process journal {file_path}. Skipping...")
-                finally:
-                    line = current_log_file.readline()
-                    
+    for journal_file in journal_files:
+        if journal_file.cmdr is not None:
+            cmdr = journal_file.cmdr
+        for event in journal_file.events:
+            if event["event"] == "Commander":
+                cmdr = str(event["Name"])
+            yield cmdr, event
+
+def read_cmdr_journal_files(log_files: Iterable[Path], cmdr: str, cancel: Optional[threading.Event] = None) -> Iterator[JournalFile]:
+    """
+    Reads the Journals of cmdr one at a time, so only the Events of the Journal being replayed are held in memory.
+    """
+    for log_file in log_files:
+        if cancel is not None and cancel.is_set():
+            return
+        journal_file = read_journal_file(log_file)
+        # Journals continuing a session have no Commander Event of their own
+        journal_file.cmdr = cmdr
+        yield journal_file
+
+def load_journal_events(timestamp: dt.date, cmdr: str, worker_count: int = 1, progress: Optional[Callable[[int, int], None]] = None, cancel: Optional[threading.Event] = None) -> Iterator[tuple[str, dict]]:
+    """
+    Lazily yields (cmdr, event) for every subscribed Journal Event needed to rebuild the active Missions of cmdr, oldest first.
+    The Journals needed are found first, newest first by their summaries. The Events are then read Journal by Journal as they are consumed.
+    """
+    journal_cache.load(journal_event_subscriptions)
+    log_files = list(iter_journal_files(timestamp, newest_first=True))
+    cmdr_files = scan_journal_files(log_files, cmdr, worker_count, progress, cancel)
+
+    journal_cache.prune(set(map(lambda x: x.name, log_files)))
+    # Saved before the replay, which drops the Events of the Journals parsed by the scan from memory
+    journal_cache.save()
+
+    yield from iter_journal_events(read_cmdr_journal_files(cmdr_files, cmdr, cancel))
+
+def select_journal_files_since(since: str) -> tuple[list[Path], list[Path]]:
+    """
+    The Journals (newest first) that may hold Events written from since on: those started on the last day before since,
+    the newest one started earlier, and any earlier one still written to after since, e.g. a long session across the boundary.
+    The second list adds the older Journals needed to tell the Commander of a session continued in the selected ones.
+    """
+    since_datetime = datetime.strptime(since, "%Y-%m-%dT%H:%M:%SZ")
+    # Journal names are not necessarily in UTC like the Event timestamps, the extra day covers any offset
+    since_date = (since_datetime - timedelta(days=1)).date()
+    since_mtime = calendar.timegm(since_datetime.timetuple())
+    log_files = list(iter_journal_files(dt.date.min, newest_first=True))
+
+    # Sorted newest first, so the Journals started since since_date come first
+    log_files_since = [log_file for log_file in log_files if get_journal_timestamp(log_file.name)[0].date() >= since_date]
+    selected = list(log_files_since)
+    for index, log_file in enumerate(log_files[len(log_files_since):]):
+        # The newest Journal started before is always taken, the game may not update the mtime of a file it keeps open
+        try:
+            if index > 0 and log_file.stat().st_mtime < since_mtime:
+                break
+        except OSError:
+            break
+        selected.append(log_file)
+
+    context_count = len(selected)
+    while 0 < context_count < len(log_files) and get_journal_timestamp(log_files[context_count - 1].name)[1] != 1:
+        context_count += 1
+    return selected, log_files[:context_count]
+
+def load_journal_events_since(cmdr: str, since: str, worker_count: int = 1) -> list[dict]:
+    """
+    Journal Events of cmdr written from since on, oldest first. Only the Journals written to since are read, see select_journal_files_since.
+    """
+    journal_cache.load(journal_event_subscriptions)
+    log_files, context_files = select_journal_files_since(since)
+    commanders = index_journal_commanders(context_files)
+    cmdr_files = [log_file for log_file in reversed(log_files) if commanders[log_file] == cmdr]
+
+    events: list[dict] = []
+    for journal_file in read_journal_files(cmdr_files, worker_count):
+        events.extend(event for event in journal_file.events if event["timestamp"] >= since)
+    journal_cache.save()
+    return events
+
+def build_cmdr_missions(events: Iterable[tuple[str, dict]], replay: Optional["MissionReplay"] = None) -> dict[str, dict[int, dict]]:
+    # Routed through the same table as the live Events in journal_entry, see mission_event_routes
+    replay = replay if replay is not None else MissionReplay()
+    router = JournalRouter()
+    route_mission_events(router, replay)
+
+    for cmdr, event in events:
+        router.route(cmdr, event)
+
+    for cmdr, missions in replay.cmdr_events.items():
+        prune_expired_missions(missions, cmdr)
+
+    return replay.cmdr_events
+
+def restore_cmdr_missions(cmdr: str, restored: RestoredMissions, worker_count: int = 1) -> Iterator[tuple[str, dict]]:
+    """
+    Yields the logged Events of the Repository Log followed by the Journal Events written after them.
+    """
+    yield from map(lambda x: (cmdr, x), restored.events)
+    journal_events = load_journal_events_since(cmdr, restored.timestamp, worker_count)
+    logger.info(f"Replaying {len(restored.events)} logged Events of CMDR {cmdr} and Journal Events since {restored.timestamp}")
+    yield from map(lambda x: (cmdr, x), skip_applied_events(journal_events, restored.timestamp, restored.applied))
+
+def get_cmdr_missions(timestamp: dt.date, cmdr: Optional[str] = None, worker_count: int = 1, progress: Optional[Callable[[int, int], None]] = None, cancel: Optional[threading.Event] = None, before: Optional[str] = None) -> dict[str, dict[int, dict]]:
+    """
+    Only the Missions of a single Commander are loaded. Without a cmdr it is the one seen most recently in the Journals.
+    """
+    if cmdr is None:
+        cmdr = get_latest_commander(timestamp)
+    if cmdr is None:
+        logger.info("No CMDR found in the Journals")
+        return {}
+
+    restored = repository_log.load(cmdr)
+    if restored is not None and restored.timestamp >= timestamp.strftime("%Y-%m-%d"):
+        # Instant restore, only Events after the Repository Log need to be read
+        replay = MissionReplay({cmdr: restored.missions})
+        events = restore_cmdr_missions(cmdr, restored, worker_count)
+    else:
+        replay = MissionReplay()
+        events = load_journal_events(timestamp, cmdr, worker_count, progress, cancel)
+    if before is not None:
+        # Events from this point on are delivered live by EDMC, they must not be applied twice
+        events = filter(lambda x: x[1]["timestamp"] < before, events)
+    cmdr_events = build_cmdr_missions(events, replay)
+    if cmdr not in cmdr_events.keys():
+        cmdr_events[cmdr] = {}
+    if before is not None and (cancel is None or not cancel.is_set()):
+        # Everything before the live Events is part of the Store now, it becomes the new Snapshot
+        repository_log.compact(cmdr, cmdr_events[cmdr], before, [])
     return cmdr_events
 
-def populate_missions_bounty(bounty: dict, missions: dict[int, dict]):
-    changed = False
-    associated_missions = [mission for mission in missions.values() if (mission["Name"].startswith("Mission_Massacre") and mission["TargetFaction"] == bounty["VictimFaction"])]
-    if associated_missions:
-        factions = []  
-        for mission in associated_missions:
-            if mission["Faction"] not in factions:
-                    
-                if "VictimCount" not in mission or mission["VictimCount"] < mission["KillCount"]:
-                    if "VictimCount" not in mission:
-                        mission["VictimCount"] = 0
-                    mission["VictimCount"] += 1
-                    logger.info(f"Mission {mission['MissionID']} kill count increased")
-                    factions.append(mission["Faction"])
-                    changed = True
-                else:
-                    next
+def get_cmdr_missions_worker(timestamp: dt.date, cmdr: Optional[str], worker_count: int, progress: Callable[[int, int], None], cb: Callable[[dict[str, dict[int, dict]]], None], cancel: threading.Event, before: Optional[str] = None) -> threading.Thread:
+    """
+    Loads the Missions on a background Thread. Only Journal Events written before the timestamp before are applied,
+    by default when the Thread was created, anything newer is expected to arrive through journal_entry.
+    cb is not called if the load was cancelled. If the load fails it is still called, with no Missions,
+    as the Repository queues every live Event until it gets the Mission Data.
+    """
+    if before is None:
+        before = datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%SZ")
 
-    return changed
+    def load():
+        try:
+            mission_store = get_cmdr_missions(timestamp, cmdr, worker_count, progress, cancel, before)
+        except Exception as ex:
+            logger.error(f"Failed to load the Missions of CMDR {cmdr if cmdr is not None else '(most recent)'} from the Journals", exc_info=ex)
+            # An empty Store for the CMDR rather than none, which would only request the same load again
+            mission_store = {cmdr: {}} if cmdr is not None else {}
+        if not cancel.is_set():
+            cb(mission_store)
+
+    thread = threading.Thread(target=load)
+    thread.name = "EDMC-Missions Journal Loader"
+    thread.daemon = True
+
+    return thread
+
+# Event -> Outcome of the Missions leaving the Store with it
+mission_finished_events = {
+    "MissionCompleted": "Completed",
+    "MissionAbandoned": "Abandoned",
+    "MissionFailed": "Failed",
+    "MissionRedirected": "Redirected"
+}
+
+# Journal Event -> Method handling it on a Mission Event target, the MissionRepository for live Events or MissionReplay
+mission_event_routes = {
+    "MissionAccepted": "notify_mission_accepted",
+    "CargoDepot": "notify_mission_cargo_delivered",
+    "Bounty": "notify_bounty_awarded",
+    **{event_name: "notify_mission_finished" for event_name in mission_finished_events.keys()}
+}
+
+# Called with every MissionAccepted Event, live or replayed, while it is still the whole Event rather than a MissionRecord
+mission_accepted_listeners: list[Callable[[dict], None]] = []
+
+def notify_mission_accepted_listeners(event: dict):
+    for listener in mission_accepted_listeners:
+        listener(event)
+
+def route_mission_events(router: JournalRouter, target: object):
+    for event_name, method_name in mission_event_routes.items():
+        handler = getattr(target, method_name)
+        router.subscribe([event_name], lambda cmdr, event, handler=handler: handler(event, cmdr))
+
+subscribe_journal_events(["Commander", "Missions"])
+subscribe_journal_events(mission_event_routes.keys())
+
+class MissionReplay:
+    """
+    Mission Event target rebuilding the Mission Stores of every CMDR from Journal Events read at startup.
+    """
+
+    def __init__(self, cmdr_events: Optional[dict[str, dict[int, dict]]] = None):
+        self.cmdr_events: dict[str, dict[int, dict]] = cmdr_events if cmdr_events is not None else {}
+        self._cmdr_bounty_indexes: dict[str, BountyIndex] = {cmdr: build_bounty_index(missions) for cmdr, missions in self.cmdr_events.items()}
+
+    def __get_missions(self, cmdr: str) -> dict[int, dict]:
+        if cmdr not in self.cmdr_events.keys():
+            self.cmdr_events[cmdr] = {}
+            self._cmdr_bounty_indexes[cmdr] = BountyIndex()
+        return self.cmdr_events[cmdr]
+
+    def notify_mission_accepted(self, mission: dict, cmdr: str):
+        notify_mission_accepted_listeners(mission)
+        # A record rather than the Event, as the replay adds progress to the Mission which must not leak into the cache
+        mission = MissionRecord(mission)
+        self.__get_missions(cmdr)[mission["MissionID"]] = mission
+        self._cmdr_bounty_indexes[cmdr].add(mission)
+
+    def notify_mission_cargo_delivered(self, cargodepot: dict, cmdr: str):
+        populate_missions_cargodepot(cargodepot, self.__get_missions(cmdr))
+
+    def notify_bounty_awarded(self, bounty: dict, cmdr: str):
+        populate_missions_bounty(bounty, self.__get_missions(cmdr), self._cmdr_bounty_indexes[cmdr])
+
+    def notify_mission_finished(self, finished: dict, cmdr: str):
+        missions = self.__get_missions(cmdr)
+        mission = missions.get(finished["MissionID"])
+        if populate_missions_finished(finished, missions, cmdr):
+            self._cmdr_bounty_indexes[cmdr].remove(mission)
+
+def populate_missions_finished(finished: dict, missions: dict[int, dict], cmdr: str) -> bool:
+    mission = missions.pop(finished["MissionID"], None)
+    if mission is None:
+        return False
+    outcome = mission_finished_events[finished["event"]]
+    logger.info(f"Mission {finished['MissionID']} {outcome.lower()}")
+    mission_archive.add(cmdr, mission, outcome, finished["timestamp"])
+    return True
+
+def prune_expired_missions(missions: dict[int, dict], cmdr: str) -> list[int]:
+    # Expiry is held as epoch seconds, see MissionRecord
+    now = calendar.timegm(datetime.utcnow().timetuple())
+    expired_uuids = [uuid for uuid, mission in missions.items() if mission.get("Expiry", now) < now]
+    return populate_missions_expired(expired_uuids, missions, cmdr)
+
+def populate_missions_expired(expired_uuids: list[int], missions: dict[int, dict], cmdr: str) -> list[int]:
+    now = datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%SZ")
+    removed_uuids: list[int] = []
+    for uuid in expired_uuids:
+        mission = missions.pop(uuid, None)
+        if mission is None:
+            continue
+        logger.info(f"Mission {uuid} expired")
+        mission_archive.add(cmdr, mission, "Expired", now)
+        removed_uuids.append(uuid)
+    return removed_uuids
+
+def populate_missions_bounty(bounty: dict, missions: dict[int, dict], bounty_index: BountyIndex) -> list[int]:
+    """
+    Returns the MissionIDs the kill was credited to, at most one per Source Faction.
+    """
+    credited_uuids = bounty_index.credit(bounty["VictimFaction"], missions)
+    for uuid in credited_uuids:
+        logger.info(f"Mission {uuid} kill count increased")
+    return credited_uuids
 
 def populate_missions_cargodepot(cargodepot: dict, missions: dict[int, dict]):
     changed = False
+    if cargodepot["UpdateType"] != "Deliver":
+        return changed
     if cargodepot["MissionID"] in missions.keys():
         logger.info(f"Mission {cargodepot['MissionID']} cargo delivered")
         mission = missions[cargodepot["MissionID"]]
         if "DeliveredCount" not in mission:
             mission["DeliveredCount"] = 0
         mission["DeliveredCount"] += cargodepot["Count"]
-        changes = True
+        changed = True
         
     return changed
@@ -7,9 +7,16 @@ from l10n import Locale
 import os
 from typing import Any, Optional
 from os.path import basename, dirname
+import threading
 from datetime import date, timedelta
-from helpers.missions import get_cmdr_missions
-from missions.repository import set_active_uuids, mission_repository, initialise_repository
+from helpers.missions import get_cmdr_missions_worker, route_mission_events
+from helpers.journal_router import journal_router
+from helpers.journal_worker import journal_worker
+from missions.archive import mission_archive
+from missions.expiry import expiry_scheduler, mission_expired_listeners
+import missions.repository
+from missions.repository import set_active_uuids, initialise_repository
+from missions.state import set_listener_dispatch, unknown_mission_writer
 
 from ui.main import main_ui
 from helpers.logger_factory import logger
@@ -20,6 +27,7 @@ this = sys.modules[__name__]  # For holding module globals
 
 plugin_name = os.path.basename(os.path.dirname(__file__))
 selected_cmdr: Optional[str] = None
+journal_load_cancelled = threading.Event()
 
 try:
     from config import config
@@ -30,11 +38,24 @@ def plugin_app(parent: tk.Frame) -> tk.Frame:
     
     main_ui.set_frame(parent)
 
+    # Changes are pushed from the Journal Worker and the merged Mission Changes are emitted from it too, as it owns
+    # the Mission State. Only the window is timed by the Tk loop, the Journal Worker has no timers.
+    def schedule_on_journal_worker(delay_ms: int, callback):
+        if delay_ms > 0:
+            main_ui.dispatch(lambda: main_ui.frame.after(delay_ms, lambda: journal_worker.submit(callback)))
+        else:
+            # Queued behind the Events already waiting, which are merged into the same Change Set
+            journal_worker.submit(callback)
+
+    if missions.repository.mission_repository is not None:
+        missions.repository.mission_repository.change_coalescer.set_scheduler(schedule_on_journal_worker)
+    expiry_scheduler.set_scheduler(main_ui.frame.after, main_ui.frame.after_cancel)
+
     if configuration.version_check_enabled:
         logger.info("Starting Version Check in new Thread...")
 
         def notify_main_ui_version_info(version_info: VersionInfo):
-            main_ui.notify_version_info(version_info)
+            main_ui.dispatch(lambda: main_ui.notify_version_info(version_info))
                 
         thread = get_version_info_worker(notify_main_ui_version_info)
         thread.start()
@@ -43,35 +64,77 @@ def plugin_app(parent: tk.Frame) -> tk.Frame:
 
     return parent
 
+def load_commander_missions(cmdr: Optional[str], before: Optional[str] = None):
+    def notify_main_ui_loading_progress(scanned_count: int, total_count: int):
+        main_ui.dispatch(lambda: main_ui.notify_loading_progress(scanned_count, total_count))
+
+    def notify_repository_missions_loaded(mission_store: dict[str, dict[int, dict]]):
+        logger.info(f"Found Missions for {len(mission_store)} CMDRs")
+
+        def apply_mission_store():
+            missions.repository.mission_repository.notify_mission_data_loaded(mission_store)
+            main_ui.dispatch(main_ui.notify_loading_finished)
+
+        journal_worker.submit(apply_mission_store)
+
+    logger.info(f"Loading Journals for CMDR {cmdr if cmdr is not None else '(most recent)'} in new Thread...")
+    thread = get_cmdr_missions_worker(
+        date.today() - timedelta(weeks=configuration.process_journal_weeks),
+        cmdr,
+        configuration.journal_worker_count,
+        notify_main_ui_loading_progress,
+        notify_repository_missions_loaded,
+        journal_load_cancelled,
+        before)
+    thread.start()
+
+def configure_plugin(config: Configuration):
+    mission_archive.resize(config.mission_archive_size)
+    if missions.repository.mission_repository is not None:
+        missions.repository.mission_repository.change_coalescer.configure(config.event_coalesce_window_ms, config.event_coalesce_batch_size)
+
 def plugin_start3(_: str) -> str:
     logger.info("Starting Mission Status Plugin")
-    mission_store = get_cmdr_missions(date.today() - timedelta(weeks=4))
-    logger.info(f"Found Missions for {len(mission_store)} CMDRs")
-    initialise_repository(mission_store)    
+    # The Repository stays in the LOADING State and queues live Events until the Journals have been read
+    initialise_repository()
+    configure_plugin(configuration)
+    settings_ui.configuration_listeners.append(configure_plugin)
+    missions.repository.commander_load_requested_listeners.append(load_commander_missions)
+    journal_router.subscribe(["Missions"], handle_missions_event)
+    route_mission_events(journal_router, missions.repository.mission_repository)
+    # Change Sets are emitted on the Journal Worker, the Expiry Scheduler and the tabs follow them on the Tk Thread
+    missions.repository.active_missions_change_set_listeners.append(
+        lambda changes, active_missions: main_ui.dispatch(lambda: expiry_scheduler.notify_mission_changes(changes, active_missions)))
+    set_listener_dispatch(main_ui.dispatch)
+    mission_expired_listeners.append(handle_missions_expired)
+    journal_worker.start()
+    # Only the most recently played CMDR is loaded, others follow once they show up in journal_entry
+    load_commander_missions(None)
+
     logger.info("Awaiting Cmdr and active missions to start building Mission Index")
     return basename(dirname(__file__))
 
+def plugin_stop():
+    # Cancelled first, so a Journal load still running neither keeps scanning nor compacts the Repository Log during shutdown
+    journal_load_cancelled.set()
+    expiry_scheduler.set_scheduler(None, None)
+    # The Repository is only saved once the Journal Worker has applied everything queued and stopped writing to it
+    journal_worker.stop()
+    if missions.repository.mission_repository is not None:
+        missions.repository.mission_repository.save()
+    unknown_mission_writer.stop()
+
+def handle_missions_event(cmdr: str, entry: dict[str, Any]):
+    active_mission_uuids = map(lambda x: int(x["MissionID"]), entry["Active"])
+    set_active_uuids(list(active_mission_uuids), cmdr)
+
+def handle_missions_expired(mission_ids: list[int]):
+    # Called from the Tk loop, the Repository is only changed on the Journal Worker
+    journal_worker.submit(lambda: missions.repository.mission_repository.notify_missions_expired(mission_ids))
+
 def journal_entry(cmdr: str, _is_beta: bool, _system: str, _station: str, entry: dict[str, Any], _state: dict[str, Any]):
-    if entry["event"] == "Missions":
-        active_mission_uuids = map(lambda x: int(x["MissionID"]), entry["Active"])        
-        set_active_uuids(list(active_mission_uuids), cmdr)
-
-    elif entry["event"] in ["MissionAbandoned", "MissionCompleted", "MissionRedirected"]:
-        mission_uuid = entry["MissionID"]
-        if mission_repository is not None:
-            mission_repository.notify_mission_finished(mission_uuid)
-            
-    elif entry["event"] == "MissionAccepted":
-        if mission_repository is not None:
-            mission_repository.notify_mission_accepted(entry, cmdr)
-
-    elif entry["event"] == "CargoDepot" and entry["UpdateType"] == "Deliver":
-        if mission_repository is not None:
-            mission_repository.notify_mission_cargo_delivered(entry, cmdr)
-
-    elif entry["event"] == "Bounty":
-        if mission_repository is not None:
-            mission_repository.notify_bounty_awarded(entry, cmdr)                            
+    # Only queued, the Journal Worker applies it so EDMC's main Thread is never held up
+    journal_worker.enqueue(cmdr, entry)
 
 def plugin_prefs(parent: Any, _cmdr: str, _is_beta: bool):
     return settings_ui.display_settings(parent)
@@ -0,0 +1,25 @@
+from collections import deque
+from missions.records import ArchivedMission
+
+class MissionArchive:
+    """
+    Compact record of finished Missions for history features. Only the most recent size records are kept,
+    a size of 0 disables the archive.
+    """
+
+    def __init__(self, size: int = 0):
+        self._records: deque[ArchivedMission] = deque(maxlen=size)
+
+    @property
+    def records(self) -> list[dict]:
+        return [record.as_dict() for record in self._records]
+
+    def resize(self, size: int):
+        self._records = deque(self._records, maxlen=max(size, 0))
+
+    def add(self, cmdr: str, mission: dict, outcome: str, timestamp: str):
+        if self._records.maxlen == 0:
+            return
+        self._records.append(ArchivedMission(cmdr, mission["MissionID"], mission["Name"], mission.get("Faction"), mission.get("Reward", 0), outcome, timestamp))
+
+mission_archive = MissionArchive()
@@ -0,0 +1,47 @@
+from dataclasses import dataclass, field
+
+@dataclass
+class MissionChangeSet:
+    """
+    Difference between two States of the active Missions.
+    added and updated are keyed by MissionID, updated only holds the Journal fields that changed, e.g. VictimCount.
+    The added Missions are read-only, as they are shared with the Snapshot they were taken from.
+    With reset set the previous State is to be discarded and added holds every active Mission.
+    """
+    added: dict[int, dict] = field(default_factory=dict)
+    removed: list[int] = field(default_factory=list)
+    updated: dict[int, dict] = field(default_factory=dict)
+    reset: bool = False
+
+    def is_empty(self) -> bool:
+        return not self.reset and len(self.added) == 0 and len(self.removed) == 0 and len(self.updated) == 0
+
+    def size(self) -> int:
+        return len(self.added) + len(self.removed) + len(self.updated)
+
+    def merge(self, changes: "MissionChangeSet"):
+        """
+        Folds the later changes into this Change Set, so applying the result equals applying both in order.
+        """
+        if changes.reset:
+            self.added = dict(changes.added)
+            self.removed = []
+            self.updated = {}
+            self.reset = True
+            return
+
+        for mission_id in changes.removed:
+            self.updated.pop(mission_id, None)
+            if self.added.pop(mission_id, None) is None and mission_id not in self.removed:
+                self.removed.append(mission_id)
+
+        for mission_id, mission in changes.added.items():
+            self.updated.pop(mission_id, None)
+            self.added[mission_id] = mission
+
+        for mission_id, fields in changes.updated.items():
+            if mission_id in self.added.keys():
+                # Added Missions are read-only, the update goes into a new copy
+                self.added[mission_id] = {**self.added[mission_id], **fields}
+            else:
+                self.updated.setdefault(mission_id, {}).update(fields)
@@ -0,0 +1,62 @@
+import threading
+from typing import Any, Callable, Optional
+from helpers.logger_factory import logger
+from missions.changes import MissionChangeSet
+
+class MissionChangeCoalescer:
+    """
+    Collects the Change Sets of bursts of Journal Events, e.g. the Bounties of a Massacre stack, and hands them on as one.
+    The merged Change Set is emitted window_ms after the first change, or once the Journal Events queued so far are applied
+    for a window of 0. Reaching max_batch_size changes emits the same way, so the latency of the UI stays bounded.
+    Changes may be pushed from any Thread. Without a scheduler every Change Set is emitted immediately.
+    """
+
+    def __init__(self, emit: Callable[[MissionChangeSet], None], window_ms: int = 0, max_batch_size: int = 0):
+        self._emit = emit
+        self.window_ms = window_ms
+        self.max_batch_size = max_batch_size
+        # (delay_ms, callback) -> handle. Runs the callback on the Thread the listeners expect, i.e. the Journal Worker.
+        self._schedule: Optional[Callable[[int, Callable[[], None]], Any]] = None
+        self._pending: Optional[MissionChangeSet] = None
+        # Delay of the earliest flush scheduled, None if there is none
+        self._scheduled_delay_ms: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def configure(self, window_ms: int, max_batch_size: int):
+        self.window_ms = max(window_ms, 0)
+        self.max_batch_size = max(max_batch_size, 0)
+
+    def set_scheduler(self, schedule: Optional[Callable[[int, Callable[[], None]], Any]]):
+        self._schedule = schedule
+
+    def push(self, changes: MissionChangeSet):
+        with self._lock:
+            if self._pending is None:
+                self._pending = changes
+            else:
+                self._pending.merge(changes)
+
+            if self._schedule is not None:
+                batch_full = self.max_batch_size > 0 and self._pending.size() >= self.max_batch_size
+                delay_ms = 0 if batch_full else self.window_ms
+                if self._scheduled_delay_ms is None or delay_ms < self._scheduled_delay_ms:
+                    self._scheduled_delay_ms = delay_ms
+                    self._schedule(delay_ms, self.__scheduled_flush)
+                return
+        self.flush()
+
+    def __scheduled_flush(self):
+        with self._lock:
+            self._scheduled_delay_ms = None
+        self.flush()
+
+    def flush(self):
+        with self._lock:
+            pending = self._pending
+            self._pending = None
+        if pending is None or pending.is_empty():
+            return
+        try:
+            self._emit(pending)
+        except Exception as ex:
+            logger.error("Failed to emit Mission Changes", exc_info=ex)
@@ -0,0 +1,53 @@
+from collections import OrderedDict
+from typing import Optional
+from helpers.logger_factory import logger
+from missions.persistence import deserialize_missions, serialize_missions
+
+class CommanderMissionStore:
+    """
+    Mission Stores of every CMDR seen, keyed by CMDR. Only the hot_count most recently used are kept as dicts,
+    the others are evicted to their serialized form and rehydrated once the CMDR is used again.
+    The pinned CMDR, the one whose Missions are active, is never evicted.
+    """
+
+    def __init__(self, hot_count: int = 2):
+        self.hot_count = max(hot_count, 1)
+        self.pinned_cmdr: Optional[str] = None
+        self._hot: OrderedDict[str, dict[int, dict]] = OrderedDict()
+        self._cold: dict[str, bytes] = {}
+
+    def __contains__(self, cmdr: str) -> bool:
+        return cmdr in self._hot or cmdr in self._cold
+
+    def __len__(self) -> int:
+        return len(self._hot) + len(self._cold)
+
+    def __getitem__(self, cmdr: str) -> dict[int, dict]:
+        if cmdr in self._cold:
+            self._hot[cmdr] = deserialize_missions(self._cold.pop(cmdr))
+            logger.info(f"Rehydrated Mission Store of CMDR {cmdr}")
+        missions = self._hot[cmdr]
+        self._hot.move_to_end(cmdr)
+        self.__evict()
+        return missions
+
+    def __setitem__(self, cmdr: str, missions: dict[int, dict]):
+        self._cold.pop(cmdr, None)
+        self._hot[cmdr] = missions
+        self._hot.move_to_end(cmdr)
+        self.__evict()
+
+    def keys(self) -> list[str]:
+        return list(self._hot.keys()) + list(self._cold.keys())
+
+    def update(self, mission_store: dict[str, dict[int, dict]]):
+        for cmdr, missions in mission_store.items():
+            self[cmdr] = missions
+
+    def __evict(self):
+        while len(self._hot) > self.hot_count:
+            cmdr = next((cmdr for cmdr in self._hot.keys() if cmdr != self.pinned_cmdr), None)
+            if cmdr is None:
+                return
+            self._cold[cmdr] = serialize_missions(self._hot.pop(cmdr))
+            logger.info(f"Evicted Mission Store of CMDR {cmdr}")
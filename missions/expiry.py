@@ -0,0 +1,163 @@
+import heapq
+from datetime import datetime, timedelta
+from typing import Any, Callable, Iterable, Optional
+from helpers.logger_factory import logger
+from missions.changes import MissionChangeSet
+from missions.records import get_expiry_datetime
+
+# Callback: (expired MissionIDs) -> void
+mission_expired_listeners: list[Callable[[list[int]], None]] = []
+
+# Upper bound of a single wait, so a changed system clock is picked up eventually
+_max_wait = timedelta(hours=1)
+
+class ExpiryScheduler:
+    """
+    Min-Heap of the Expiry of the active Missions. Only wakes up through the injected scheduler (Tk after) when the
+    next Mission expires, or when a watched countdown reaches the next minute and its text changes.
+    """
+
+    def __init__(self):
+        self._heap: list[tuple[datetime, int]] = []
+        # Current Expiry of every Mission in the Heap. Removed Missions stay in the Heap until they reach the top.
+        self._expiries: dict[int, datetime] = {}
+        # key -> (next change, expiries, callback)
+        self._countdowns: dict[str, tuple[datetime, list[datetime], Callable[[], None]]] = {}
+        self._schedule: Optional[Callable[[int, Callable[[], None]], Any]] = None
+        self._cancel: Optional[Callable[[Any], None]] = None
+        self._wakeup: Optional[tuple[datetime, Any]] = None
+
+    def set_scheduler(self, schedule: Optional[Callable[[int, Callable[[], None]], Any]], cancel: Optional[Callable[[Any], None]]):
+        self.__cancel_wakeup()
+        self._schedule = schedule
+        self._cancel = cancel
+        self.__reschedule()
+
+    def reset(self, missions: Iterable[dict]):
+        self._heap = []
+        self._expiries = {}
+        for mission in missions:
+            entry = self.__track(mission)
+            if entry is not None:
+                self._heap.append(entry)
+        heapq.heapify(self._heap)
+        self.__reschedule()
+
+    def add(self, mission: dict):
+        entry = self.__track(mission)
+        if entry is not None:
+            heapq.heappush(self._heap, entry)
+            self.__reschedule()
+
+    def remove(self, mission_id: int):
+        if self._expiries.pop(mission_id, None) is None:
+            return
+        if len(self._heap) > 2 * len(self._expiries) + 32:
+            self._heap = [(expiry, mission_id) for mission_id, expiry in self._expiries.items()]
+            heapq.heapify(self._heap)
+
+    def notify_mission_changes(self, changes: MissionChangeSet, _missions: dict[int, dict]):
+        """
+        Follows the active Missions through the Change Sets of the Repository, dispatched to the Tk Thread by load.
+        """
+        if changes.reset:
+            self.reset(changes.added.values())
+            return
+        for mission_id in changes.removed:
+            self.remove(mission_id)
+        for mission in changes.added.values():
+            self.add(mission)
+
+    def watch_countdown(self, key: str, expiries: list[Optional[datetime]], callback: Callable[[], None]):
+        """
+        Calls callback whenever the minutes left until one of the expiries change. Replaces any previous watch of key.
+        """
+        expiries = [expiry for expiry in expiries if expiry is not None]
+        next_change = ExpiryScheduler.__get_next_countdown_change(expiries, datetime.utcnow())
+        if next_change is None:
+            self.unwatch_countdown(key)
+            return
+        self._countdowns[key] = (next_change, expiries, callback)
+        self.__reschedule()
+
+    def unwatch_countdown(self, key: str):
+        self._countdowns.pop(key, None)
+
+    def __track(self, mission: dict) -> Optional[tuple[datetime, int]]:
+        """
+        Records the Expiry of mission and returns its Heap entry, which the caller puts on the Heap.
+        """
+        try:
+            expiry = get_expiry_datetime(mission["Expiry"])
+        except Exception as ex:
+            logger.warning(f"Error Occurred: {ex}\nMission {mission.get('MissionID')} has no valid Expiry. Skipping...")
+            return None
+        self._expiries[mission["MissionID"]] = expiry
+        return (expiry, mission["MissionID"])
+
+    @staticmethod
+    def __get_next_countdown_change(expiries: list[datetime], now: datetime) -> Optional[datetime]:
+        # Countdowns are shown in whole minutes, which change every 60 seconds counting back from the Expiry
+        changes = [now + ((expiry - now) % timedelta(minutes=1) or timedelta(minutes=1)) for expiry in expiries if expiry > now]
+        return min(changes, default=None)
+
+    def __get_next_wakeup(self) -> Optional[datetime]:
+        while len(self._heap) > 0 and self._expiries.get(self._heap[0][1]) != self._heap[0][0]:
+            heapq.heappop(self._heap)
+        wakeups = [next_change for next_change, _, _ in self._countdowns.values()]
+        if len(self._heap) > 0:
+            wakeups.append(self._heap[0][0])
+        return min(wakeups, default=None)
+
+    def __cancel_wakeup(self):
+        if self._wakeup is not None and self._cancel is not None:
+            self._cancel(self._wakeup[1])
+        self._wakeup = None
+
+    def __reschedule(self):
+        if self._schedule is None:
+            return
+        next_wakeup = self.__get_next_wakeup()
+        if next_wakeup is None:
+            self.__cancel_wakeup()
+            return
+        if self._wakeup is not None and self._wakeup[0] <= next_wakeup:
+            return
+        self.__cancel_wakeup()
+        delay = min(max(next_wakeup - datetime.utcnow(), timedelta(0)), _max_wait)
+        # Rounded up, waking before the Expiry would only schedule another wakeup
+        delay_ms = int(delay / timedelta(milliseconds=1)) + 1
+        self._wakeup = (next_wakeup, self._schedule(delay_ms, self.__wake))
+
+    def __wake(self):
+        self._wakeup = None
+        now = datetime.utcnow()
+
+        expired_ids: list[int] = []
+        while len(self._heap) > 0 and self._heap[0][0] <= now:
+            expiry, mission_id = heapq.heappop(self._heap)
+            if self._expiries.get(mission_id) == expiry:
+                del self._expiries[mission_id]
+                expired_ids.append(mission_id)
+        if len(expired_ids) > 0:
+            logger.info(f"{len(expired_ids)} Missions expired")
+            for listener in mission_expired_listeners:
+                listener(expired_ids)
+
+        for key, (next_change, expiries, callback) in list(self._countdowns.items()):
+            if next_change > now:
+                continue
+            next_change = ExpiryScheduler.__get_next_countdown_change(expiries, now)
+            if next_change is None:
+                self.unwatch_countdown(key)
+            else:
+                self._countdowns[key] = (next_change, expiries, callback)
+            try:
+                # The callback may watch the countdown again with new expiries when it redraws
+                callback()
+            except Exception as ex:
+                logger.error("Countdown callback failed", exc_info=ex)
+
+        self.__reschedule()
+
+expiry_scheduler = ExpiryScheduler()
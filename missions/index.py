@@ -0,0 +1,65 @@
+from collections import deque
+
+class BountyIndex:
+    """
+    TargetFaction -> SourceFaction -> MissionIDs of incomplete Massacre Missions in the order they were accepted.
+    The Game credits a kill to the oldest incomplete Mission of every Source Faction targeting the victim's faction,
+    which is the head of each of these queues.
+    """
+
+    def __init__(self):
+        self._queues: dict[str, dict[str, deque[int]]] = {}
+
+    @staticmethod
+    def is_massacre(mission: dict) -> bool:
+        return mission["Name"].startswith("Mission_Massacre") and "TargetFaction" in mission
+
+    def add(self, mission: dict):
+        if not BountyIndex.is_massacre(mission) or mission.get("VictimCount", 0) >= mission["KillCount"]:
+            return
+        source_queues = self._queues.setdefault(mission["TargetFaction"], {})
+        source_queues.setdefault(mission["Faction"], deque()).append(mission["MissionID"])
+
+    def remove(self, mission: dict):
+        if not BountyIndex.is_massacre(mission):
+            return
+        source_queues = self._queues.get(mission["TargetFaction"], {})
+        queue = source_queues.get(mission["Faction"])
+        if queue is None or mission["MissionID"] not in queue:
+            return
+        queue.remove(mission["MissionID"])
+        if len(queue) == 0:
+            del source_queues[mission["Faction"]]
+
+    def credit(self, victim_faction: str, missions: dict[int, dict]) -> list[int]:
+        """
+        Counts a kill of victim_faction towards the Missions it is credited to and returns their MissionIDs.
+        """
+        credited_uuids: list[int] = []
+        source_queues = self._queues.get(victim_faction)
+        if source_queues is None:
+            return credited_uuids
+
+        for source_faction in list(source_queues.keys()):
+            queue = source_queues[source_faction]
+            while len(queue) > 0:
+                mission = missions.get(queue[0])
+                if mission is None or mission.get("VictimCount", 0) >= mission["KillCount"]:
+                    # Finished some other way, or progressed without going through this index
+                    queue.popleft()
+                    continue
+                mission["VictimCount"] = mission.get("VictimCount", 0) + 1
+                credited_uuids.append(mission["MissionID"])
+                if mission["VictimCount"] >= mission["KillCount"]:
+                    queue.popleft()
+                break
+            if len(queue) == 0:
+                del source_queues[source_faction]
+
+        return credited_uuids
+
+def build_bounty_index(missions: dict[int, dict]) -> BountyIndex:
+    bounty_index = BountyIndex()
+    for mission in missions.values():
+        bounty_index.add(mission)
+    return bounty_index
@@ -0,0 +1,157 @@
+import re
+import json
+import zlib
+import threading
+from pathlib import Path
+from os.path import dirname
+from collections import Counter
+from typing import Iterable, Iterator, Optional
+from helpers.logger_factory import logger
+from missions.records import MissionRecord
+
+_repository_log_version = 1
+_repository_log_location = Path(dirname(__file__)).parent.joinpath("repository_log")
+# Log lines after which the Log is folded into a new Snapshot
+_compact_after = 256
+
+def serialize_missions(missions: dict[int, dict]) -> bytes:
+    """
+    Compact form of a Mission Store. The Missions carry their MissionID, so only the values are kept.
+    """
+    return zlib.compress(json.dumps([mission.as_dict() for mission in missions.values()], separators=(",", ":")).encode("utf8"))
+
+def deserialize_missions(data: bytes) -> dict[int, MissionRecord]:
+    missions: list[dict] = json.loads(zlib.decompress(data).decode("utf8"))
+    return {mission["MissionID"]: MissionRecord(mission) for mission in missions}
+
+def __get_event_key(event: dict) -> str:
+    return json.dumps(event, sort_keys=True, separators=(",", ":"))
+
+def skip_applied_events(events: Iterable[dict], timestamp: str, applied: list[dict]) -> Iterator[dict]:
+    """
+    Yields the events, oldest first, which are not yet part of a state whose boundary is timestamp and applied.
+    """
+    applied_keys = Counter(map(__get_event_key, applied))
+    for event in events:
+        if event["timestamp"] < timestamp:
+            continue
+        if event["timestamp"] == timestamp and len(applied_keys) > 0:
+            key = __get_event_key(event)
+            if applied_keys[key] > 0:
+                applied_keys[key] -= 1
+                continue
+        yield event
+
+class RestoredMissions:
+    def __init__(self, missions: dict[int, dict], events: list[dict], timestamp: str, applied: list[dict]):
+        self.missions = missions
+        # Logged Journal Events to be applied on top of missions, oldest first
+        self.events = events
+        # Journal Events from timestamp on are not part of missions and events, except for the applied ones
+        self.timestamp = timestamp
+        self.applied = applied
+
+class RepositoryLog:
+    """
+    Durable state of the Mission Repository. Per CMDR a Snapshot of the Mission Store and an append-only Log of the
+    Journal Events applied to it since, so a restart only has to read the Journals written after the last logged Event.
+    Besides its timestamp the boundary keeps the Events of that very second already applied, as a second may hold several.
+    """
+
+    def __init__(self, location: Path, compact_after: int = _compact_after):
+        self.location = location
+        self.compact_after = compact_after
+        # cmdr -> (timestamp, Events of timestamp already applied)
+        self._boundaries: dict[str, tuple[str, list[dict]]] = {}
+        self._log_lengths: dict[str, int] = {}
+        self.lock = threading.Lock()
+
+    def __get_path(self, cmdr: str, suffix: str) -> Path:
+        return self.location.joinpath(re.sub(r"[^\w\-]", "_", cmdr) + suffix)
+
+    def load(self, cmdr: str) -> Optional[RestoredMissions]:
+        snapshot_path = self.__get_path(cmdr, ".snapshot.json")
+        if not snapshot_path.is_file():
+            return None
+        try:
+            with open(snapshot_path, "r", encoding="utf8") as snapshot_file:
+                snapshot = json.load(snapshot_file)
+            if snapshot.get("version") != _repository_log_version or snapshot.get("cmdr") != cmdr:
+                logger.info(f"Repository Snapshot of CMDR {cmdr} is outdated. Ignoring...")
+                return None
+
+            timestamp: str = snapshot["timestamp"]
+            applied: list[dict] = snapshot["applied"]
+            logged_events: list[dict] = []
+            log_path = self.__get_path(cmdr, ".log")
+            if log_path.is_file():
+                with open(log_path, "r", encoding="utf8") as log_file:
+                    for line in log_file:
+                        # A crash may have left the last line incomplete
+                        if not line.endswith("\n"):
+                            break
+                        logged_events.append(json.loads(line))
+
+            # Anything logged before the Snapshot was written is already part of it
+            events = list(skip_applied_events(logged_events, timestamp, applied))
+            applied = list(applied)
+            for event in events:
+                if event["timestamp"] > timestamp:
+                    timestamp = event["timestamp"]
+                    applied = []
+                if event["timestamp"] == timestamp:
+                    applied.append(event)
+        except Exception as ex:
+            logger.warning(f"Error Occurred: {ex}\nFailed to load Repository Snapshot of CMDR {cmdr}. Ignoring...")
+            return None
+
+        missions = {mission["MissionID"]: MissionRecord(mission) for mission in snapshot["missions"]}
+        logger.info(f"Restored {len(missions)} Missions and {len(events)} logged Events of CMDR {cmdr}")
+        return RestoredMissions(missions, events, timestamp, applied)
+
+    def append(self, cmdr: str, event: dict):
+        if cmdr not in self._boundaries.keys():
+            # Nothing to append to before the first Snapshot
+            return
+        timestamp, applied = self._boundaries[cmdr]
+        if event["timestamp"] > timestamp:
+            self._boundaries[cmdr] = (event["timestamp"], [event])
+        elif event["timestamp"] == timestamp:
+            applied.append(event)
+        try:
+            with self.lock, open(self.__get_path(cmdr, ".log"), "a", encoding="utf8") as log_file:
+                log_file.write(json.dumps(event, separators=(",", ":")) + "\n")
+            self._log_lengths[cmdr] = self._log_lengths.get(cmdr, 0) + 1
+        except Exception as ex:
+            logger.warning(f"Error Occurred: {ex}\nFailed to append to the Repository Log of CMDR {cmdr}. Ignoring...")
+
+    def is_compaction_due(self, cmdr: str) -> bool:
+        return self._log_lengths.get(cmdr, 0) >= self.compact_after
+
+    def has_boundary(self, cmdr: str) -> bool:
+        return cmdr in self._boundaries.keys()
+
+    def compact(self, cmdr: str, missions: dict[int, dict], timestamp: Optional[str] = None, applied: Optional[list[dict]] = None):
+        """
+        Writes missions as the new Snapshot of cmdr and empties its Log. Without timestamp the boundary of the Log is kept.
+        """
+        if timestamp is not None:
+            self._boundaries[cmdr] = (timestamp, list(applied or []))
+        if cmdr not in self._boundaries.keys():
+            return
+        timestamp, applied = self._boundaries[cmdr]
+        try:
+            with self.lock:
+                self.location.mkdir(exist_ok=True)
+                snapshot_path = self.__get_path(cmdr, ".snapshot.json")
+                temp_path = self.__get_path(cmdr, ".snapshot.tmp")
+                with open(temp_path, "w", encoding="utf8") as snapshot_file:
+                    json.dump({"version": _repository_log_version, "cmdr": cmdr, "timestamp": timestamp, "applied": applied, "missions": [mission.as_dict() for mission in missions.values()]}, snapshot_file, separators=(",", ":"))
+                temp_path.replace(snapshot_path)
+                # A crash right here leaves Events already part of the Snapshot in the Log, load skips them
+                self.__get_path(cmdr, ".log").unlink(missing_ok=True)
+            self._log_lengths[cmdr] = 0
+        except Exception as ex:
+            logger.warning(f"Error Occurred: {ex}\nFailed to save Repository Snapshot of CMDR {cmdr}. Ignoring...")
+
+repository_log = RepositoryLog(_repository_log_location)
@@ -0,0 +1,100 @@
+import sys
+import calendar
+from collections.abc import Mapping
+from datetime import datetime
+from typing import Any, Iterator, Optional
+
+_expiry_format = "%Y-%m-%dT%H:%M:%SZ"
+
+def intern_name(name: Optional[str]) -> Optional[str]:
+    """
+    Faction, System, Station and Commodity names repeat across most Missions of a stack, so a single copy is shared.
+    """
+    return sys.intern(name) if name is not None else None
+
+def parse_expiry(expiry: str) -> int:
+    """
+    Journal Expiry (ISO, UTC) as epoch seconds.
+    """
+    return calendar.timegm(datetime.strptime(expiry, _expiry_format).timetuple())
+
+def format_expiry(expiry: int) -> str:
+    """
+    Epoch seconds as a Journal Expiry, the inverse of parse_expiry.
+    """
+    return get_expiry_datetime(expiry).strftime(_expiry_format)
+
+def get_expiry_datetime(expiry: int) -> datetime:
+    return datetime.utcfromtimestamp(expiry)
+
+class ArchivedMission:
+    """
+    Compact record of a finished Mission, only holding what the history needs.
+    """
+    __slots__ = ("cmdr", "mission_id", "name", "source_faction", "reward", "outcome", "timestamp")
+
+    def __init__(self, cmdr: str, mission_id: int, name: str, source_faction: Optional[str], reward: int, outcome: str, timestamp: str):
+        self.cmdr = intern_name(cmdr)
+        self.mission_id = mission_id
+        self.name = intern_name(name)
+        self.source_faction = intern_name(source_faction)
+        self.reward = reward
+        self.outcome = intern_name(outcome)
+        self.timestamp = timestamp
+
+    def as_dict(self) -> dict:
+        return {attribute: getattr(self, attribute) for attribute in ArchivedMission.__slots__}
+
+class MissionRecord(Mapping):
+    """
+    Compact record of an active Mission, in place of its MissionAccepted Event. Only the fields something reads are kept,
+    under their Journal names, so the record is read like the Event, e.g. mission["KillCount"] or mission.get("VictimCount", 0).
+    A field the Event did not have is None and counts as missing. The raw Events are only kept where they are persisted.
+    Unlike in the Event, Expiry is held as epoch seconds. as_dict turns it back into the Journal format for persisting.
+    """
+    __slots__ = (
+        "MissionID", "Name", "LocalisedName", "Faction", "Reward", "Expiry", "Wing",
+        "DestinationSystem", "DestinationStation", "TargetType", "TargetFaction", "KillCount",
+        "Commodity_Localised", "Count", "VictimCount", "DeliveredCount"
+    )
+
+    def __init__(self, fields: Mapping):
+        for field in MissionRecord.__slots__:
+            value = fields.get(field)
+            setattr(self, field, intern_name(value) if field in _interned_mission_fields and isinstance(value, str) else value)
+        if isinstance(self.Expiry, str):
+            self.Expiry = parse_expiry(self.Expiry)
+
+    def __getitem__(self, field: str) -> Any:
+        value = getattr(self, field, None) if field in _mission_record_fields else None
+        if value is None:
+            raise KeyError(field)
+        return value
+
+    def __setitem__(self, field: str, value: Any):
+        # Only the progress (VictimCount, DeliveredCount) changes after a Mission was accepted
+        if field not in _mission_record_fields:
+            raise KeyError(field)
+        setattr(self, field, value)
+
+    def __iter__(self) -> Iterator[str]:
+        return (field for field in MissionRecord.__slots__ if getattr(self, field) is not None)
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def copy(self) -> "MissionRecord":
+        return MissionRecord(self)
+
+    def as_dict(self) -> dict:
+        """
+        The fields in the form of the MissionAccepted Event, as persisted and read back by the constructor.
+        """
+        fields = dict(self)
+        if self.Expiry is not None:
+            fields["Expiry"] = format_expiry(self.Expiry)
+        return fields
+
+_mission_record_fields = frozenset(MissionRecord.__slots__)
+# Names, Factions and places repeat across the Missions of a stack
+_interned_mission_fields = frozenset(["Name", "Faction", "DestinationSystem", "DestinationStation", "TargetType", "TargetFaction", "Commodity_Localised"])
@@ -1,21 +1,35 @@
 from enum import Flag
+from datetime import datetime
 from typing import Callable, Optional
 from helpers.logger_factory import logger
-from helpers.missions import populate_missions_bounty, populate_missions_cargodepot
+from helpers.missions import notify_mission_accepted_listeners, populate_missions_bounty, populate_missions_cargodepot, populate_missions_expired, populate_missions_finished, prune_expired_missions
+from missions.index import BountyIndex, build_bounty_index
+from missions.changes import MissionChangeSet
+from missions.coalescer import MissionChangeCoalescer
+from missions.commanders import CommanderMissionStore
+from missions.snapshot import MissionSnapshot
+from missions.persistence import repository_log
+from missions.records import MissionRecord
 
 # The listeners are stored as a Tuple of Activator and Callback.
 # Callback: (mission as dict<mission_uuid, mission>) -> void
 active_missions_changed_event_listeners: list[Callable[[dict[int, dict]], None]] = []
 all_missions_changed_event_listeners: list[Callable[[dict[int, dict]], None]] = []
+# Called with the CMDR whose Missions have not been loaded yet and the timestamp its Journal Events are to be loaded up to,
+# those from then on are applied live. The listener is expected to call notify_mission_data_loaded.
+commander_load_requested_listeners: list[Callable[[str, str], None]] = []
+# Callback: (changes, active missions as dict<mission_uuid, mission>) -> void
+active_missions_change_set_listeners: list[Callable[[MissionChangeSet, dict[int, dict]], None]] = []
 
 _active_uuids_init = False
 _active_uuids: list[int] = []
 
 class MissionRepoState(Flag):
-    AWAITING_INIT = 0b00
-    HAS_MISSION_DATA = 0b10
-    HAS_MISSIONS_EVENT = 0b01
-    INITIALIZED = 0b11
+    AWAITING_INIT = 0b000
+    HAS_MISSION_DATA = 0b010
+    HAS_MISSIONS_EVENT = 0b001
+    INITIALIZED = 0b011
+    LOADING = 0b100
 
 class MissionRepository:
 
@@ -27,74 +41,213 @@ class MissionRepository:
     def active_missions(self):
         return self._active_missions
 
-    def __init__(self, mission_store: dict[str, dict[int, dict]], cmdr: Optional[str] = None):
+    @property
+    def snapshot(self) -> MissionSnapshot:
+        """
+        Latest immutable Snapshot of the active Missions. Unlike active_missions it may be read from any Thread.
+        """
+        return self._snapshot
+
+    @property
+    def change_coalescer(self):
+        return self._change_coalescer
+
+    @property
+    def is_loading(self):
+        return self._state & MissionRepoState.LOADING == MissionRepoState.LOADING
+
+    def __init__(self, mission_store: Optional[dict[str, dict[int, dict]]], cmdr: Optional[str] = None):
         self._cmdr = cmdr
         self._state = MissionRepoState.AWAITING_INIT
-        self._mission_store: dict[str, dict[int, dict]] = mission_store
+        # Only the most recently seen CMDRs are kept in memory as is, see CommanderMissionStore
+        self._mission_store = CommanderMissionStore()
+        self._active_missions: dict[int, MissionRecord] = {}
+        # Replaced as a whole on every change, which is atomic for readers on other Threads
+        self._snapshot = MissionSnapshot()
+        # Massacre Missions of _active_missions a Bounty can be credited to
+        self._bounty_index = BountyIndex()
+        # Changes are merged here before they reach the listeners, see MissionChangeCoalescer
+        self._change_coalescer = MissionChangeCoalescer(self.__notify_change_listeners)
+        # Live Events that arrive while the Journals are still being loaded in the background. Applied once loaded.
+        # Stored as handler, arguments and the CMDR of the Journal Event, None for anything else
+        self._pending_events: list[tuple[Callable, tuple, Optional[str]]] = []
+        if mission_store is None:
+            self._state |= MissionRepoState.LOADING
+        else:
+            self.notify_mission_data_loaded(mission_store)
+
+    def __defer_while_loading(self, handler: Callable, *args) -> bool:
+        if self.is_loading:
+            self._pending_events.append((handler, args, None))
+            return True
+        return False
+
+    def __defer_event_while_loading(self, handler: Callable, event: dict, cmdr: str) -> bool:
+        if self.is_loading:
+            self._pending_events.append((handler, (event, cmdr), cmdr))
+            return True
+        return False
+
+    def __log_event(self, event: dict, cmdr: str):
+        # Compacted before the Event is applied, so the Snapshot matches the boundary of the Log
+        if repository_log.is_compaction_due(cmdr) and cmdr in self._mission_store:
+            repository_log.compact(cmdr, self._mission_store[cmdr])
+        repository_log.append(cmdr, event)
+
+    def save(self):
+        if self._cmdr is not None and self._cmdr in self._mission_store and not self.is_loading:
+            repository_log.compact(self._cmdr, self._mission_store[self._cmdr])
+
+    def request_commander_load(self, cmdr: Optional[str]):
+        logger.info(f"Requesting Mission Data for CMDR {cmdr}")
+        self._state |= MissionRepoState.LOADING
+        before = datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%SZ")
+        # Deferred Events of cmdr written before the cut-off are replayed from the Journals by the load, they must not be applied twice
+        pending_count = len(self._pending_events)
+        self._pending_events = [(handler, args, event_cmdr) for handler, args, event_cmdr in self._pending_events if event_cmdr != cmdr or args[0]["timestamp"] >= before]
+        if len(self._pending_events) != pending_count:
+            logger.info(f"Dropped {pending_count - len(self._pending_events)} pending Events of CMDR {cmdr} the load replays")
+        for listener in commander_load_requested_listeners:
+            listener(cmdr, before)
+
+    def notify_mission_data_loaded(self, mission_store: dict[str, dict[int, dict]]):
+        logger.info(f"Mission Data for {len(mission_store)} CMDRs loaded. Applying {len(self._pending_events)} pending Events")
+        self._mission_store.update(mission_store)
+        self._state &= ~MissionRepoState.LOADING
         self._state |= MissionRepoState.HAS_MISSION_DATA
-        self._active_missions: dict[int, dict] = {}
+
         global _active_uuids, _active_uuids_init
-        if _active_uuids_init:
-            self.notify_mission_active_uuids(_active_uuids, cmdr)
+        if _active_uuids_init and self._cmdr is not None:
+            self.notify_mission_active_uuids(_active_uuids, self._cmdr)
+
+        pending_events = self._pending_events
+        self._pending_events = []
+        for handler, args, _ in pending_events:
+            handler(*args)
 
     def notify_mission_active_uuids(self, uuids: list[int], cmdr: str):
         self._cmdr = cmdr
+        if self.is_loading:
+            # set_active_uuids keeps the latest UUIDs, they are applied as soon as loading has finished
+            return
+
         if cmdr is None:
             logger.error("Cmdr unknown! Aborting")
             return
+
+        if cmdr not in self._mission_store:
+            # Only the most recent CMDR is loaded on startup, any other is loaded once it is seen
+            self.request_commander_load(cmdr)
+            return
+        self._mission_store.pinned_cmdr = cmdr
         
-        if self._state & MissionRepoState.HAS_MISSIONS_EVENT == 0:
+        if not self._state & MissionRepoState.HAS_MISSIONS_EVENT:
             self._state |= MissionRepoState.HAS_MISSIONS_EVENT
         else:
             logger.warning("Mission UUIDs were passed even though the State is already initialized")
             pass
 
+        prune_expired_missions(self._mission_store[cmdr], cmdr)
         self._active_missions = {}
 
-        all_known_uuids = list(self._mission_store[cmdr].keys())
-        for uuid in uuids:
-            if uuid in all_known_uuids:
-                self._active_missions[uuid] = self._mission_store[cmdr][uuid]
-            else:
-                logger.warning("A Mission could not be found in the Store even though the UUID is present")
-                pass
+        # Built in Store order, which is the order the Missions were accepted in, as Bounties are credited in that order
+        active_uuids = set(uuids)
+        for uuid, mission in self._mission_store[cmdr].items():
+            if uuid in active_uuids:
+                self._active_missions[uuid] = mission
+        if len(self._active_missions) != len(active_uuids):
+            logger.warning("A Mission could not be found in the Store even though the UUID is present")
+        self._bounty_index = build_bounty_index(self._active_missions)
+
+        # The Game only lists Missions that are still in progress. Anything else in the Store has finished
+        # without us seeing it, so it is evicted to keep the Store the size of the Mission Stack.
+        self._mission_store[cmdr] = dict(self._active_missions)
+        repository_log.compact(cmdr, self._mission_store[cmdr])
 
         #  Emit an Event notifying that the pool of active missions has changed
         #  The listeners should be CMDR-agnostic. They just get the active mission list.
-        for listener in active_missions_changed_event_listeners:
-            listener(self._active_missions)
+        self.emit_changes(MissionChangeSet(added=dict(self._active_missions), reset=True))
 
     def notify_mission_accepted(self, mission: dict, cmdr: str):
+        if self.__defer_event_while_loading(self.notify_mission_accepted, mission, cmdr):
+            return
+        self.__log_event(mission, cmdr)
         logger.info(f"New Mission with ID {mission['MissionID']} has been accepted")
+        notify_mission_accepted_listeners(mission)
+        # The raw Event is only kept in the Repository Log, the Store holds the compact record
+        mission = MissionRecord(mission)
+        if cmdr not in self._mission_store:
+            self._mission_store[cmdr] = {}
         self._mission_store[cmdr][mission["MissionID"]] = mission
         self._active_missions[mission["MissionID"]] = mission
+        self._bounty_index.add(mission)
+        self.emit_changes(MissionChangeSet(added={mission["MissionID"]: mission}))
         self.update_all_listeners()
 
     def notify_mission_cargo_delivered(self, mission: dict, cmdr: str):
+        if self.__defer_event_while_loading(self.notify_mission_cargo_delivered, mission, cmdr):
+            return
+        self.__log_event(mission, cmdr)
         changed = populate_missions_cargodepot(mission, self._active_missions)
-        if changed:            
-            global active_missions_changed_event_listeners
-            for listener in active_missions_changed_event_listeners:
-                listener(self._active_missions)
+        if changed:
+            delivered_count = self._active_missions[mission["MissionID"]]["DeliveredCount"]
+            self.emit_changes(MissionChangeSet(updated={mission["MissionID"]: {"DeliveredCount": delivered_count}}))
             
     def notify_bounty_awarded(self, mission: dict, cmdr: str):
-        changed = populate_missions_bounty(mission, self._active_missions)
-        if changed:
-            global active_missions_changed_event_listeners
-            for listener in active_missions_changed_event_listeners:
-                listener(self._active_missions)
+        if self.__defer_event_while_loading(self.notify_bounty_awarded, mission, cmdr):
+            return
+        self.__log_event(mission, cmdr)
+        credited_uuids = populate_missions_bounty(mission, self._active_missions, self._bounty_index)
+        if credited_uuids:
+            updated = {uuid: {"VictimCount": self._active_missions[uuid]["VictimCount"]} for uuid in credited_uuids}
+            self.emit_changes(MissionChangeSet(updated=updated))
             
-    def notify_mission_finished(self, mission_uuid: int):
-        logger.info(f"Mission {mission_uuid} removed")
-        del self._active_missions[mission_uuid]
-        global active_missions_changed_event_listeners
+    def notify_mission_finished(self, mission: dict, cmdr: str):
+        if self.__defer_event_while_loading(self.notify_mission_finished, mission, cmdr):
+            return
+        self.__log_event(mission, cmdr)
+        if cmdr in self._mission_store:
+            populate_missions_finished(mission, self._mission_store[cmdr], cmdr)
+        active_mission = self._active_missions.pop(mission["MissionID"], None)
+        if active_mission is None:
+            return
+        self._bounty_index.remove(active_mission)
+        logger.info(f"Mission {mission['MissionID']} removed")
+        self.emit_changes(MissionChangeSet(removed=[mission["MissionID"]]))
+
+    def notify_missions_expired(self, mission_ids: list[int]):
+        if self.__defer_while_loading(self.notify_missions_expired, mission_ids):
+            return
+        if self._cmdr in self._mission_store:
+            populate_missions_expired(mission_ids, self._mission_store[self._cmdr], self._cmdr)
+        removed_ids: list[int] = []
+        for mission_id in mission_ids:
+            mission = self._active_missions.pop(mission_id, None)
+            if mission is None:
+                continue
+            self._bounty_index.remove(mission)
+            removed_ids.append(mission_id)
+        if len(removed_ids) > 0:
+            self.emit_changes(MissionChangeSet(removed=removed_ids))
+
+    def emit_changes(self, changes: MissionChangeSet):
+        self._snapshot = self._snapshot.apply(changes, self._active_missions, self._cmdr)
+        # Listeners hand the Change Set on to the Tk Thread, so it holds the Snapshot's frozen copies rather than the dicts this Thread keeps changing
+        changes.added = {mission_id: self._snapshot.missions[mission_id] for mission_id in changes.added.keys() if mission_id in self._snapshot.missions}
+        self._change_coalescer.push(changes)
+
+    def __notify_change_listeners(self, changes: MissionChangeSet):
+        global active_missions_change_set_listeners, active_missions_changed_event_listeners
+        # Emitted on the Journal Worker, but listeners pass the Missions on to the Tk Thread, so the Snapshot is handed out
+        missions = self._snapshot.missions
+        for listener in active_missions_change_set_listeners:
+            listener(changes, missions)
+        # Listeners without Change Set support are handed the full pool of active Missions
         for listener in active_missions_changed_event_listeners:
-            listener(self._active_missions)
+            listener(missions)
 
     def update_all_listeners(self):
-        global active_missions_changed_event_listeners, all_missions_changed_event_listeners
-        for listener in active_missions_changed_event_listeners:
-            listener(self._active_missions)
+        global all_missions_changed_event_listeners
         for listener in all_missions_changed_event_listeners:
             listener(self._mission_store[self._cmdr])
 
@@ -102,7 +255,10 @@ class MissionRepository:
 mission_repository: Optional[MissionRepository] = None
 
 
-def initialise_repository(missions: dict[str, dict[int, dict]]):
+def initialise_repository(missions: Optional[dict[str, dict[int, dict]]] = None):
+    """
+    Without missions the Repository starts in the LOADING State until notify_mission_data_loaded is called.
+    """
     global mission_repository
     mission_repository = MissionRepository(missions)
 
@@ -114,4 +270,3 @@ def set_active_uuids(uuids: list[int], cmdr: str):
 
     if mission_repository is not None:
         mission_repository.notify_mission_active_uuids(_active_uuids, cmdr)
-
@@ -0,0 +1,26 @@
+from dataclasses import dataclass, field
+from types import MappingProxyType
+from typing import Mapping, Optional
+from missions.changes import MissionChangeSet
+
+@dataclass(frozen=True)
+class MissionSnapshot:
+    """
+    Immutable view of the active Missions at one version of the Repository. Safe to read from any Thread,
+    a changed Repository publishes a new Snapshot instead of changing this one.
+    """
+    version: int = 0
+    cmdr: Optional[str] = None
+    missions: Mapping[int, Mapping] = field(default_factory=lambda: MappingProxyType({}))
+
+    def apply(self, changes: MissionChangeSet, active_missions: dict[int, dict], cmdr: Optional[str]) -> "MissionSnapshot":
+        """
+        Next Snapshot after changes. Only the added and updated Missions are copied, all others are shared with this one.
+        """
+        missions = {} if changes.reset else dict(self.missions)
+        for mission_id in changes.removed:
+            missions.pop(mission_id, None)
+        for mission_id in list(changes.added.keys()) + list(changes.updated.keys()):
+            if mission_id in active_missions:
+                missions[mission_id] = MappingProxyType(active_missions[mission_id].copy())
+        return MissionSnapshot(self.version + 1, cmdr, MappingProxyType(missions))
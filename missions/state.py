@@ -1,8 +1,14 @@
-from typing import Callable
+from typing import Callable, Mapping, Optional
 from helpers.logger_factory import logger
-from dataclasses import dataclass
-from datetime import datetime
+from dataclasses import dataclass, replace
+from types import MappingProxyType
 import missions.repository
+from helpers.missions import mission_accepted_listeners
+from missions.changes import MissionChangeSet
+from missions.types import get_mission_type
+from missions.records import intern_name
+from missions.table import GroupAggregate, mission_table
+from missions.unknown import UnknownMissionWriter
 from pathlib import Path
 from config import config
 
@@ -15,14 +21,14 @@ else:
 if file_location is None or file_location == "":
     file_location = config.default_journal_dir
     
-@dataclass
+@dataclass(frozen=True, slots=True)
 class MassacreMission:
     id: int
     target_system: str
     target_station: str    
     source_faction: str
     reward: int
-    expiry: datetime
+    expiry: int
     is_wing: bool
     target_type: str
     target_faction: str 
@@ -45,14 +51,14 @@ class MassacreMission:
         }
         return as_dict
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class MiningMission:
     id: int
     target_system: str
     target_station: str        
     source_faction: str
     reward: int
-    expiry: datetime
+    expiry: int
     is_wing: bool
     commodity: str
     required_count: int
@@ -74,14 +80,14 @@ class MiningMission:
         return as_dict
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class CollectMission:
     id: int
     target_system: str
     target_station: str    
     source_faction: str
     reward: int
-    expiry: datetime
+    expiry: int
     is_wing: bool
     commodity: str
     required_count: int
@@ -102,14 +108,14 @@ class CollectMission:
         }
         return as_dict
     
-@dataclass
+@dataclass(frozen=True, slots=True)
 class CourierMission:
     id: int
     target_system: str
     target_station: str
     source_faction: str
     reward: int
-    expiry: datetime
+    expiry: int
     is_wing: bool
     target_faction: str 
     
@@ -128,14 +134,14 @@ class CourierMission:
     
 def get_massacre_from_event(event: dict) -> MassacreMission:
     mission_id: int = event["MissionID"]
-    target_system: str = event["DestinationSystem"]
-    target_station: str = event["DestinationStation"]
-    source_faction: str = event["Faction"]
+    target_system: str = intern_name(event["DestinationSystem"])
+    target_station: str = intern_name(event["DestinationStation"])
+    source_faction: str = intern_name(event["Faction"])
     reward: int = event["Reward"]
-    expiry: datetime = event["Expiry"]
+    expiry: int = event["Expiry"]
     wing: bool = event["Wing"]
-    target_type: str = event["TargetType"]
-    target_faction: str = event["TargetFaction"]
+    target_type: str = intern_name(event["TargetType"])
+    target_faction: str = intern_name(event["TargetFaction"])
     kill_count: int = event["KillCount"]
     victim_count: int = event.get("VictimCount",0)
     return MassacreMission(
@@ -154,13 +160,13 @@ def get_massacre_from_event(event: dict) -> MassacreMission:
 
 def get_mining_from_event(event: dict) -> MiningMission:
     mission_id: int = event["MissionID"]
-    target_system: str = event["DestinationSystem"]
-    target_station: str = event["DestinationStation"]
-    source_faction: str = event["Faction"]
+    target_system: str = intern_name(event["DestinationSystem"])
+    target_station: str = intern_name(event["DestinationStation"])
+    source_faction: str = intern_name(event["Faction"])
     reward: int = event["Reward"]
-    expiry: datetime = event["Expiry"]
+    expiry: int = event["Expiry"]
     wing: bool = event["Wing"]
-    commodity: str = event["Commodity_Localised"]
+    commodity: str = intern_name(event["Commodity_Localised"])
     required_count: int = event["Count"]
     delivered_count: int = event.get("DeliveredCount",0)
     return MiningMission(
@@ -178,16 +184,16 @@ def get_mining_from_event(event: dict) -> MiningMission:
 
 def get_collect_from_event(event: dict) -> CollectMission:
     mission_id: int = event["MissionID"]
-    target_system: str = event["DestinationSystem"]
-    target_station: str = event["DestinationStation"]
-    source_faction: str = event["Faction"]
+    target_system: str = intern_name(event["DestinationSystem"])
+    target_station: str = intern_name(event["DestinationStation"])
+    source_faction: str = intern_name(event["Faction"])
     reward: int = event["Reward"]
-    expiry: datetime = event["Expiry"]
+    expiry: int = event["Expiry"]
     wing: bool = event["Wing"]
-    commodity: str = event["Commodity_Localised"]
+    commodity: str = intern_name(event["Commodity_Localised"])
     required_count: int = event["Count"]
     delivered_count: int = event.get("DeliveredCount",0)
-    return MiningMission(
+    return CollectMission(
             mission_id,
             target_system, 
             target_station, 
@@ -202,13 +208,13 @@ def get_collect_from_event(event: dict) -> CollectMission:
 
 def get_courier_from_event(event: dict) -> CourierMission:
     mission_id: int = event["MissionID"]
-    target_system: str = event["DestinationSystem"]
-    target_station: str = event["DestinationStation"]
-    source_faction: str = event["Faction"]
+    target_system: str = intern_name(event["DestinationSystem"])
+    target_station: str = intern_name(event["DestinationStation"])
+    source_faction: str = intern_name(event["Faction"])
     reward: int = event["Reward"]
-    expiry: datetime = event["Expiry"]
+    expiry: int = event["Expiry"]
     wing: bool = event["Wing"]
-    target_faction: str = event["TargetFaction"]
+    target_faction: str = intern_name(event["TargetFaction"])
     return CourierMission(
             mission_id,
             target_system, 
@@ -220,72 +226,176 @@ def get_courier_from_event(event: dict) -> CourierMission:
             target_faction
         )
 
-massacre_mission_listeners: list[Callable[[dict[int, MassacreMission]], None]] = []
+@dataclass(frozen=True)
+class MissionFamilyState:
+    """
+    Active Missions of a Mission Family and their Mission Table aggregates, taken on the Journal Worker once they changed.
+    Nothing in it is changed afterwards, so the tabs may read it on the Tk Thread.
+    """
+    missions: Mapping[int, object]
+    # group -> aggregate, see MissionTable.aggregate
+    aggregates: dict[str, GroupAggregate]
+    # attribute -> distinct values, e.g. the Target Factions of Massacre Missions
+    attribute_values: dict[str, list[str]]
+
+massacre_mission_listeners: list[Callable[[MissionFamilyState], None]] = []
 _massacre_mission_store: dict[int, MassacreMission] = {}
 
-mining_mission_listeners: list[Callable[[dict[int, MiningMission]], None]] = []
+mining_mission_listeners: list[Callable[[MissionFamilyState], None]] = []
 _mining_mission_store: dict[int, MiningMission] = {}
 
-collect_mission_listeners: list[Callable[[dict[int, CollectMission]], None]] = []
+collect_mission_listeners: list[Callable[[MissionFamilyState], None]] = []
 _collect_mission_store: dict[int, CollectMission] = {}
 
-courier_mission_listeners: list[Callable[[dict[int, CourierMission]], None]] = []
+courier_mission_listeners: list[Callable[[MissionFamilyState], None]] = []
 _courier_mission_store: dict[int, CourierMission] = {}
 
-def get_mission_type(mission: dict) -> bool:
-    name = mission["Name"]
-    target_type = mission.get('TargetType', None)
-    if name.startswith("Mission_Massacre") and "OnFoot" not in name and target_type:
-        return "massacre"
-    elif name.startswith("Mission_Mining") and "OnFoot" not in name:
-        return "mining"
-    elif name.startswith("Mission_Collect") and "OnFoot" not in name:
-        return "collect"    
-    elif name.startswith("Mission_Courier") and "OnFoot" not in name:
-        return "courier"        
-    else:
-        return "unknown"
+# Hands a call of the family listeners to the Thread they expect, i.e. the Tk Thread. Called directly without one.
+_listener_dispatch: Optional[Callable[[Callable[[], None]], None]] = None
 
-def save_unknown_mission_type_json(mission: dict):    
-    file_path = Path(file_location, "unknown_mission_types.json")
-    with open(file_path, "a") as file:
-        file.write(f"{mission}\n")
-        
-def __handle_new_missions_state(data: dict[int, dict]):
+def set_listener_dispatch(dispatch: Optional[Callable[[Callable[[], None]], None]]):
+    global _listener_dispatch
+    _listener_dispatch = dispatch
 
-    logger.info(f"Received {len(data)} new missions.")
-    
-    _massacre_mission_store.clear()
-    _mining_mission_store.clear()
-    _collect_mission_store.clear()
-    _courier_mission_store.clear()
-    
-    for mission in data.values():
+unknown_mission_writer = UnknownMissionWriter(Path(file_location, "unknown_mission_types.json"))
+
+def save_unknown_mission_type_json(mission: dict):
+    unknown_mission_writer.record(mission)
+
+def __record_unknown_mission(event: dict):
+    # Recorded from the MissionAccepted Event, whose fields a MissionRecord of an unknown Type would mostly drop
+    if get_mission_type(event) == "unknown":
+        save_unknown_mission_type_json(event)
         
-        mission_id = mission["MissionID"]
+# MissionID -> Type, every Mission is only classified once
+_mission_types: dict[int, str] = {}
+
+# Journal field -> Mission attribute, for the fields a MissionChangeSet may update
+_mission_field_attributes = {
+    "VictimCount": "victim_count",
+    "DeliveredCount": "delivered_count"
+}
+
+@dataclass
+class TrackedMissionFamily:
+    """
+    Store, listeners and conversion of a Mission Family shown in a tab. Families of missions.types without one are only classified.
+    """
+    store: dict
+    listeners: list[Callable]
+    from_event: Callable[[dict], object]
+    # Typed Mission -> (group, required count, progress count) of its Mission Table row
+    get_table_row: Callable[[object], tuple[str, int, int]]
+    # Typed Mission -> values the tab warns about when they differ between Missions
+    get_attributes: Callable[[object], Optional[dict[str, str]]] = lambda mission: None
+
+_tracked_families: dict[str, TrackedMissionFamily] = {
+    "massacre": TrackedMissionFamily(_massacre_mission_store, massacre_mission_listeners, get_massacre_from_event,
+        lambda mission: (mission.source_faction, mission.kill_count, mission.victim_count),
+        lambda mission: {"target_faction": mission.target_faction, "target_type": mission.target_type, "target_system": mission.target_system}),
+    "mining": TrackedMissionFamily(_mining_mission_store, mining_mission_listeners, get_mining_from_event,
+        lambda mission: (mission.commodity, mission.required_count, mission.delivered_count)),
+    "collect": TrackedMissionFamily(_collect_mission_store, collect_mission_listeners, get_collect_from_event,
+        lambda mission: (mission.commodity, mission.required_count, mission.delivered_count)),
+    "courier": TrackedMissionFamily(_courier_mission_store, courier_mission_listeners, get_courier_from_event,
+        lambda mission: (f"{mission.target_system}\\{mission.target_station}", 1, 0))
+}
+
+def __classify_mission(mission: dict) -> str:
+    mission_id = mission["MissionID"]
+    mission_type = _mission_types.get(mission_id)
+    if mission_type is None:
         mission_type = get_mission_type(mission)
-        
-        if mission_type == "massacre":
-            _massacre_mission_store[mission_id] = get_massacre_from_event(mission)
-        elif mission_type == "mining":
-            _mining_mission_store[mission_id] = get_mining_from_event(mission)
-        elif mission_type == "collect":
-            _collect_mission_store[mission_id] = get_collect_from_event(mission)
-        elif mission_type == "courier":
-            _courier_mission_store[mission_id] = get_courier_from_event(mission)            
-        else:
-            save_unknown_mission_type_json(mission)
+        _mission_types[mission_id] = mission_type
+    return mission_type
 
-    for listener in massacre_mission_listeners:
-        listener(_massacre_mission_store)
+def __add_to_table(mission_type: str, typed_mission):
+    family = _tracked_families[mission_type]
+    group, required_count, progress_count = family.get_table_row(typed_mission)
+    mission_table.add(typed_mission.id, mission_type, group, typed_mission.reward, typed_mission.is_wing, required_count, progress_count, typed_mission.expiry, family.get_attributes(typed_mission))
 
-    for listener in mining_mission_listeners:
-        listener(_mining_mission_store)
+def __update_mission_fields(mission_type: str, typed_mission, fields: dict) -> bool:
+    attributes = {}
+    for field, value in fields.items():
+        attribute = _mission_field_attributes.get(field)
+        if attribute is not None and hasattr(typed_mission, attribute) and getattr(typed_mission, attribute) != value:
+            attributes[attribute] = value
+    if len(attributes) == 0:
+        return False
+    # Typed Missions are frozen, States already handed to the tabs keep the previous one
+    family = _tracked_families[mission_type]
+    typed_mission = family.store[typed_mission.id] = replace(typed_mission, **attributes)
+    _, _, progress_count = family.get_table_row(typed_mission)
+    mission_table.update_progress(typed_mission.id, progress_count)
+    return True
 
-    for listener in collect_mission_listeners:
-        listener(_collect_mission_store)
+def __get_family_state(mission_type: str, family: TrackedMissionFamily) -> MissionFamilyState:
+    return MissionFamilyState(
+        MappingProxyType(dict(family.store)),
+        mission_table.aggregate(mission_type),
+        mission_table.get_attribute_value_lists(mission_type)
+    )
 
-    for listener in courier_mission_listeners:
-        listener(_courier_mission_store)
-        
-missions.repository.active_missions_changed_event_listeners.append(__handle_new_missions_state)
+def __notify_listener(listener: Callable[[MissionFamilyState], None], family_state: MissionFamilyState):
+    if _listener_dispatch is None:
+        listener(family_state)
+    else:
+        _listener_dispatch(lambda: listener(family_state))
+
+def __handle_mission_changes(changes: MissionChangeSet, data: dict[int, dict]):
+    """
+    Keeps the typed Missions and the Mission Table in line with the Change Sets of the Repository. Called on the
+    Journal Worker, the only Thread changing them. The tabs are handed a MissionFamilyState of every Type that changed.
+    """
+
+    logger.info(f"Received {len(changes.added)} new, {len(changes.updated)} updated and {len(changes.removed)} removed missions.")
+
+    changed_types: set[str] = set()
+
+    if changes.reset:
+        # Missions still active keep their typed object, only the ones no longer active are dropped
+        for mission_type, family in _tracked_families.items():
+            for mission_id in [mission_id for mission_id in family.store.keys() if mission_id not in changes.added]:
+                del family.store[mission_id]
+                mission_table.remove(mission_id)
+            changed_types.add(mission_type)
+        for mission_id in [mission_id for mission_id in _mission_types.keys() if mission_id not in changes.added]:
+            del _mission_types[mission_id]
+
+    for mission_id in changes.removed:
+        mission_type = _mission_types.pop(mission_id, None)
+        if mission_type in _tracked_families.keys() and _tracked_families[mission_type].store.pop(mission_id, None) is not None:
+            mission_table.remove(mission_id)
+            changed_types.add(mission_type)
+
+    for mission_id, mission in changes.added.items():
+        mission_type = __classify_mission(mission)
+        if mission_type not in _tracked_families.keys():
+            continue
+        family = _tracked_families[mission_type]
+        store = family.store
+        if mission_id in store.keys():
+            # Classified and converted once, the same Mission only brings its progress
+            if __update_mission_fields(mission_type, store[mission_id], {field: mission[field] for field in _mission_field_attributes.keys() if field in mission}):
+                changed_types.add(mission_type)
+        else:
+            store[mission_id] = family.from_event(mission)
+            __add_to_table(mission_type, store[mission_id])
+            changed_types.add(mission_type)
+
+    for mission_id, fields in changes.updated.items():
+        mission_type = _mission_types.get(mission_id)
+        if mission_type not in _tracked_families.keys() or mission_id not in _tracked_families[mission_type].store.keys():
+            continue
+        if __update_mission_fields(mission_type, _tracked_families[mission_type].store[mission_id], fields):
+            changed_types.add(mission_type)
+
+    # Only the Mission Types that were touched are announced, a Bounty never reaches the Courier or Mining listeners
+    for mission_type, family in _tracked_families.items():
+        if mission_type in changed_types:
+            family_state = __get_family_state(mission_type, family)
+            for listener in family.listeners:
+                __notify_listener(listener, family_state)
+
+missions.repository.active_missions_change_set_listeners.append(__handle_mission_changes)
+mission_accepted_listeners.append(__record_unknown_mission)
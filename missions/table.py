@@ -0,0 +1,185 @@
+from array import array
+from collections import Counter
+from dataclasses import dataclass, replace
+from typing import Optional
+
+@dataclass
+class GroupAggregate:
+    mission_count: int = 0
+    required_count: int = 0
+    progress_count: int = 0
+    reward: int = 0
+    shareable_reward: int = 0
+    min_expiry: Optional[int] = None
+    max_expiry: Optional[int] = None
+
+class MissionTable:
+    """
+    Columnar store of the Missions, one array per field and one row per Mission. Every Mission belongs to a group
+    of its Type (e.g. the Source Faction of Massacre Missions) and counts required_count towards its goal,
+    of which progress_count are done (e.g. KillCount and VictimCount). Rows are removed by moving the last row into them.
+    The aggregate of every group is adjusted as its Missions are added, progressed and removed, so reading them costs O(groups).
+    Only used on the Journal Worker by missions.state, the tabs are handed copies of the aggregates.
+    """
+
+    def __init__(self):
+        self._rows: dict[int, int] = {}
+        # Mission Type -> code stored in the types column, assigned as Types show up
+        self._type_codes: dict[str, int] = {}
+        self._type_names: list[str] = []
+        self._group_codes: dict[str, int] = {}
+        self._group_names: list[str] = []
+
+        self._mission_ids = array("q")
+        self._types = array("b")
+        self._groups = array("q")
+        self._rewards = array("q")
+        self._shareable_rewards = array("q")
+        self._required_counts = array("q")
+        self._progress_counts = array("q")
+        self._expiries = array("q")
+
+        # Mission Type -> group -> aggregate of its Missions
+        self._aggregates: dict[str, dict[str, GroupAggregate]] = {}
+        # (Mission Type, group) -> MissionIDs, to find the next Expiry bound when the Mission holding it is removed
+        self._group_members: dict[tuple[str, str], set[int]] = {}
+        # Mission Type -> attribute -> number of Missions per value, e.g. the Target Factions of Massacre Missions
+        self._attribute_counts: dict[str, dict[str, Counter[str]]] = {}
+        self._mission_attributes: dict[int, dict[str, str]] = {}
+
+    def __len__(self):
+        return len(self._rows)
+
+    def __contains__(self, mission_id: int):
+        return mission_id in self._rows
+
+    def __get_columns(self) -> list[array]:
+        return [self._mission_ids, self._types, self._groups, self._rewards, self._shareable_rewards, self._required_counts, self._progress_counts, self._expiries]
+
+    def __get_group_code(self, group: str) -> int:
+        code = self._group_codes.get(group)
+        if code is None:
+            code = len(self._group_names)
+            self._group_codes[group] = code
+            self._group_names.append(group)
+        return code
+
+    def __get_type_code(self, mission_type: str) -> int:
+        code = self._type_codes.get(mission_type)
+        if code is None:
+            code = len(self._type_names)
+            self._type_codes[mission_type] = code
+            self._type_names.append(mission_type)
+        return code
+
+    def add(self, mission_id: int, mission_type: str, group: str, reward: int, is_wing: bool, required_count: int, progress_count: int, expiry: int, attributes: Optional[dict[str, str]] = None):
+        if mission_id in self._rows:
+            self.remove(mission_id)
+        self._rows[mission_id] = len(self._mission_ids)
+        self._mission_ids.append(mission_id)
+        self._types.append(self.__get_type_code(mission_type))
+        self._groups.append(self.__get_group_code(group))
+        self._rewards.append(reward)
+        self._shareable_rewards.append(reward if is_wing else 0)
+        self._required_counts.append(required_count)
+        self._progress_counts.append(progress_count)
+        self._expiries.append(expiry)
+
+        aggregate = self._aggregates.setdefault(mission_type, {}).setdefault(group, GroupAggregate())
+        aggregate.mission_count += 1
+        aggregate.required_count += required_count
+        aggregate.progress_count += progress_count
+        aggregate.reward += reward
+        if is_wing:
+            aggregate.shareable_reward += reward
+        if aggregate.min_expiry is None or expiry < aggregate.min_expiry:
+            aggregate.min_expiry = expiry
+        if aggregate.max_expiry is None or expiry > aggregate.max_expiry:
+            aggregate.max_expiry = expiry
+        self._group_members.setdefault((mission_type, group), set()).add(mission_id)
+
+        if attributes is not None:
+            self._mission_attributes[mission_id] = attributes
+            attribute_counts = self._attribute_counts.setdefault(mission_type, {})
+            for attribute, value in attributes.items():
+                attribute_counts.setdefault(attribute, Counter())[value] += 1
+
+    def update_progress(self, mission_id: int, progress_count: int):
+        row = self._rows.get(mission_id)
+        if row is not None:
+            aggregate = self._aggregates[self._type_names[self._types[row]]][self._group_names[self._groups[row]]]
+            aggregate.progress_count += progress_count - self._progress_counts[row]
+            self._progress_counts[row] = progress_count
+
+    def remove(self, mission_id: int):
+        row = self._rows.pop(mission_id, None)
+        if row is None:
+            return
+        mission_type = self._type_names[self._types[row]]
+        self.__remove_from_aggregate(mission_id, row, mission_type, self._group_names[self._groups[row]])
+
+        attributes = self._mission_attributes.pop(mission_id, None)
+        if attributes is not None:
+            attribute_counts = self._attribute_counts[mission_type]
+            for attribute, value in attributes.items():
+                attribute_counts[attribute][value] -= 1
+                if attribute_counts[attribute][value] <= 0:
+                    del attribute_counts[attribute][value]
+
+        last_row = len(self._mission_ids) - 1
+        if row != last_row:
+            for column in self.__get_columns():
+                column[row] = column[last_row]
+            self._rows[self._mission_ids[row]] = row
+        for column in self.__get_columns():
+            column.pop()
+
+    def __remove_from_aggregate(self, mission_id: int, row: int, mission_type: str, group: str):
+        members = self._group_members[(mission_type, group)]
+        members.discard(mission_id)
+        if len(members) == 0:
+            del self._group_members[(mission_type, group)]
+            del self._aggregates[mission_type][group]
+            return
+
+        aggregate = self._aggregates[mission_type][group]
+        aggregate.mission_count -= 1
+        aggregate.required_count -= self._required_counts[row]
+        aggregate.progress_count -= self._progress_counts[row]
+        aggregate.reward -= self._rewards[row]
+        aggregate.shareable_reward -= self._shareable_rewards[row]
+        # Only when the Mission held a bound are the remaining Missions of the group looked at
+        expiry = self._expiries[row]
+        if expiry == aggregate.min_expiry or expiry == aggregate.max_expiry:
+            expiries = [self._expiries[self._rows[member]] for member in members]
+            aggregate.min_expiry = min(expiries)
+            aggregate.max_expiry = max(expiries)
+
+    def clear(self):
+        self._rows.clear()
+        for column in self.__get_columns():
+            del column[:]
+        self._aggregates.clear()
+        self._group_members.clear()
+        self._attribute_counts.clear()
+        self._mission_attributes.clear()
+
+    def aggregate(self, mission_type: str) -> dict[str, GroupAggregate]:
+        """
+        Sums, Mission count and Expiry range of every group of mission_type.
+        """
+        return {group: replace(aggregate) for group, aggregate in self._aggregates.get(mission_type, {}).items()}
+
+    def get_attribute_values(self, mission_type: str, attribute: str) -> list[str]:
+        """
+        Distinct values of attribute among the Missions of mission_type, in the order they were first added.
+        """
+        return list(self._attribute_counts.get(mission_type, {}).get(attribute, {}).keys())
+
+    def get_attribute_value_lists(self, mission_type: str) -> dict[str, list[str]]:
+        """
+        Distinct values of every attribute of mission_type, see get_attribute_values.
+        """
+        return {attribute: list(counts.keys()) for attribute, counts in self._attribute_counts.get(mission_type, {}).items()}
+
+mission_table = MissionTable()
@@ -0,0 +1,77 @@
+from dataclasses import dataclass
+from typing import Optional
+
+@dataclass(frozen=True)
+class MissionFamily:
+    """
+    Rule classifying Missions by their Name. A Mission belongs to the first registered Family one of whose prefixes
+    its Name starts with, which contains none of the excluded parts, and whose required fields the Mission has.
+    """
+    name: str
+    prefixes: tuple[str, ...]
+    required_fields: tuple[str, ...] = ()
+    excluded: tuple[str, ...] = ()
+
+class MissionTypeRegistry:
+    """
+    Registered Mission Families, with the candidate Families of every Mission Name looked up once and remembered,
+    as the Game only uses a few hundred distinct Names.
+    """
+
+    def __init__(self):
+        self._families: list[MissionFamily] = []
+        # prefix -> Families in order of registration, looked up by slicing the Name to each of the prefix lengths
+        self._prefixes: dict[str, list[MissionFamily]] = {}
+        self._prefix_lengths: list[int] = []
+        self._candidates: dict[str, list[MissionFamily]] = {}
+
+    @property
+    def families(self) -> list[MissionFamily]:
+        return list(self._families)
+
+    def register(self, family: MissionFamily):
+        if self.get(family.name) is not None:
+            raise ValueError(f"Mission Family {family.name} is already registered")
+        self._families.append(family)
+        for prefix in family.prefixes:
+            self._prefixes.setdefault(prefix, []).append(family)
+        self._prefix_lengths = sorted({len(prefix) for prefix in self._prefixes.keys()})
+        self._candidates.clear()
+
+    def get(self, name: str) -> Optional[MissionFamily]:
+        return next((family for family in self._families if family.name == name), None)
+
+    def __get_candidates(self, mission_name: str) -> list[MissionFamily]:
+        candidates = self._candidates.get(mission_name)
+        if candidates is None:
+            matches: set[str] = set()
+            for length in self._prefix_lengths:
+                if length > len(mission_name):
+                    break
+                for family in self._prefixes.get(mission_name[:length], []):
+                    if not any(part in mission_name for part in family.excluded):
+                        matches.add(family.name)
+            candidates = [family for family in self._families if family.name in matches]
+            self._candidates[mission_name] = candidates
+        return candidates
+
+    def classify(self, mission: dict) -> str:
+        for family in self.__get_candidates(mission["Name"]):
+            if all(mission.get(field) for field in family.required_fields):
+                return family.name
+        return "unknown"
+
+mission_type_registry = MissionTypeRegistry()
+mission_type_registry.register(MissionFamily("massacre", ("Mission_Massacre",), required_fields=("TargetType",), excluded=("OnFoot",)))
+mission_type_registry.register(MissionFamily("mining", ("Mission_Mining",), excluded=("OnFoot",)))
+mission_type_registry.register(MissionFamily("collect", ("Mission_Collect",), excluded=("OnFoot",)))
+mission_type_registry.register(MissionFamily("courier", ("Mission_Courier",), excluded=("OnFoot",)))
+mission_type_registry.register(MissionFamily("passenger", ("Mission_Passenger",), excluded=("OnFoot",)))
+mission_type_registry.register(MissionFamily("delivery", ("Mission_Delivery",), excluded=("OnFoot",)))
+mission_type_registry.register(MissionFamily("salvage", ("Mission_Salvage",), excluded=("OnFoot",)))
+mission_type_registry.register(MissionFamily("assassination", ("Mission_Assassinate",), excluded=("OnFoot",)))
+mission_type_registry.register(MissionFamily("sightseeing", ("Mission_Sightseeing",), excluded=("OnFoot",)))
+mission_type_registry.register(MissionFamily("onfoot", ("Mission_OnFoot",)))
+
+def get_mission_type(mission: dict) -> str:
+    return mission_type_registry.classify(mission)
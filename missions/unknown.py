@@ -0,0 +1,105 @@
+import re
+import json
+import threading
+from pathlib import Path
+from typing import Optional
+from helpers.logger_factory import logger
+
+# Seconds recorded Missions are buffered for before they are written
+_flush_interval = 5.0
+# Once the file grows past this, it is rotated into a single backup before the next batch
+_max_file_size = 1024 * 1024
+_mission_id_pattern = re.compile(r"""["']MissionID["']: (\d+)""")
+
+class UnknownMissionWriter:
+    """
+    Writes Missions of no known Type to a file for later analysis, each MissionID at most once.
+    Recorded Missions are buffered and appended in batches from a background Thread, so the recording Thread never waits on the disk.
+    The MissionIDs already in the file are only read on that background Thread, before its first batch is written.
+    """
+
+    def __init__(self, path: Path, flush_interval: float = _flush_interval, max_file_size: int = _max_file_size):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.max_file_size = max_file_size
+        # MissionIDs in the file, only touched by the writing Thread
+        self._recorded_ids: Optional[set[int]] = None
+        # MissionIDs recorded in this session, so a Mission is buffered once no matter how often it is seen
+        self._buffered_ids: set[int] = set()
+        self._buffer: list[dict] = []
+        self._condition = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._stopped = False
+
+    def __get_backup_path(self) -> Path:
+        return self.path.with_suffix(".1" + self.path.suffix)
+
+    def __load_recorded_ids(self) -> set[int]:
+        recorded_ids: set[int] = set()
+        for path in [self.__get_backup_path(), self.path]:
+            try:
+                if path.is_file():
+                    with open(path, "r", encoding="utf8") as file:
+                        for line in file:
+                            # Older Versions wrote the Python representation rather than JSON, which this matches as well
+                            match = _mission_id_pattern.search(line)
+                            if match is not None:
+                                recorded_ids.add(int(match.group(1)))
+            except Exception as ex:
+                logger.warning(f"Error Occurred: {ex}\nFailed to read {path}. Skipping...")
+        return recorded_ids
+
+    def record(self, mission: dict):
+        with self._condition:
+            if self._stopped:
+                return
+            if mission["MissionID"] in self._buffered_ids:
+                return
+            self._buffered_ids.add(mission["MissionID"])
+            self._buffer.append(dict(mission))
+            if self._thread is None:
+                self._thread = threading.Thread(target=self.__run, name="EDMC-Missions Unknown Mission Writer", daemon=True)
+                self._thread.start()
+
+    def __run(self):
+        while True:
+            with self._condition:
+                if not self._stopped:
+                    self._condition.wait(self.flush_interval)
+                stopped = self._stopped
+            self.flush()
+            if stopped:
+                return
+
+    def flush(self):
+        with self._condition:
+            missions = self._buffer
+            self._buffer = []
+        if len(missions) == 0:
+            return
+        if self._recorded_ids is None:
+            self._recorded_ids = self.__load_recorded_ids()
+        missions = [mission for mission in missions if mission["MissionID"] not in self._recorded_ids]
+        if len(missions) == 0:
+            return
+        self._recorded_ids.update(mission["MissionID"] for mission in missions)
+        try:
+            if self.path.is_file() and self.path.stat().st_size > self.max_file_size:
+                self.path.replace(self.__get_backup_path())
+            with open(self.path, "a", encoding="utf8") as file:
+                file.writelines(json.dumps(mission) + "\n" for mission in missions)
+        except Exception as ex:
+            logger.warning(f"Error Occurred: {ex}\nFailed to write {len(missions)} unknown Missions to {self.path}. Skipping...")
+
+    def stop(self):
+        """
+        Writes what is still buffered and ends the background Thread.
+        """
+        with self._condition:
+            self._stopped = True
+            self._condition.notify()
+            thread = self._thread
+        if thread is not None:
+            thread.join(timeout=2 * self.flush_interval)
+        else:
+            self.flush()
@@ -1,4 +1,5 @@
 import json
+import logging
 import tkinter as tk
 from tkinter import ttk
 from tkinter import font
@@ -7,10 +8,12 @@ from dataclasses import dataclass
 from datetime import datetime, timedelta
 
 import ui.settings
-from missions.state import collect_mission_listeners, CollectMission
+from missions.state import collect_mission_listeners, MissionFamilyState
 from ui.settings import Configuration, configuration, settings_ui
 from helpers.logger_factory import logger
 from helpers.ui import get_expiry_text
+from missions.expiry import expiry_scheduler
+from missions.records import get_expiry_datetime
 from theme import theme
 #from helpers.overlay import overlay
 
@@ -26,20 +29,21 @@ class CollectMissionData:
         min_expiry: datetime = None
         max_expiry: datetime = None
 
-    def __init__(self, collect_mission_store: dict[int, CollectMission]):
+    def __init__(self, collect_mission_state: MissionFamilyState):
         self.warnings: list[str] = []
         # if Log Level is set to DEBUG, this will output the current Collect Mission State to the Log File.
         # for easy searching, you can Ctrl+F for "COLLECT_MISSION_DATA_INPUT" and get the line below that.
-        logger.debug("CollectMissionData input below: COLLECT_MISSION_DATA_INPUT")
-        try:
-            debug_message_state: dict[int, dict] = {}
-            for k in collect_mission_store.keys():
-                v = collect_mission_store[k]
-                debug_message_state[k] = v.as_dict()
-            logger.debug(json.dumps(debug_message_state))
-        except Exception:
-            logger.error("Failed to Log debug_message_state")
-            pass
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("CollectMissionData input below: COLLECT_MISSION_DATA_INPUT")
+            try:
+                debug_message_state: dict[int, dict] = {}
+                for k in collect_mission_state.missions.keys():
+                    v = collect_mission_state.missions[k]
+                    debug_message_state[k] = v.as_dict()
+                logger.debug(json.dumps(debug_message_state))
+            except Exception:
+                logger.error("Failed to Log debug_message_state")
+                pass
 
         self.commodities: dict[str, CollectMissionData.CommodityState] = {}
 
@@ -51,25 +55,17 @@ class CollectMissionData:
         self.min_expiry: datetime = None
         self.max_expiry: datetime = None
         
-        for mission in collect_mission_store.values():
-            commodity_required = mission.commodity
-            if commodity_required not in self.commodities.keys():
-                self.commodities[commodity_required] = CollectMissionData.CommodityState()
-            commodity_state = self.commodities[commodity_required]
-            
-            commodity_state.mission_count += 1
-            commodity_state.required_count += mission.required_count
-            commodity_state.delivered_count += mission.delivered_count
-            commodity_state.reward += mission.reward
-
-            if mission.is_wing:
-                commodity_state.shareable_reward += mission.reward
-
-            expiry = datetime.strptime(mission.expiry,"%Y-%m-%dT%H:%M:%SZ")                
-            if commodity_state.min_expiry is None or expiry < commodity_state.min_expiry:
-                commodity_state.min_expiry = expiry                
-            if commodity_state.max_expiry is None or expiry > commodity_state.max_expiry:
-                commodity_state.max_expiry = expiry                
+        # Sums and Expiry range per Commodity come from the Mission Table aggregates taken on the Journal Worker
+        for commodity_required, aggregate in collect_mission_state.aggregates.items():
+            self.commodities[commodity_required] = CollectMissionData.CommodityState(
+                mission_count=aggregate.mission_count,
+                required_count=aggregate.required_count,
+                delivered_count=aggregate.progress_count,
+                reward=aggregate.reward,
+                shareable_reward=aggregate.shareable_reward,
+                min_expiry=get_expiry_datetime(aggregate.min_expiry),
+                max_expiry=get_expiry_datetime(aggregate.max_expiry)
+            )
                 
         # After all Missions have been handled, iterate through the faction_to_count_lookup to calculate the Total Rewards   
         for commodity_state in self.commodities.values():
@@ -103,11 +99,13 @@ class CollectUI:
         self.frame: Optional[tk.Frame] = None
         self.data: Optional[CollectMissionData] = None
         self.settings: GridUiSettings = GridUiSettings(configuration)
+        # Expiry of the stats row, the countdown only updates its text
+        self.expiry_label: Optional[tk.Label] = None
 
         settings_ui.configuration_listeners.append(self.notify_settings_changed)
         collect_mission_listeners.append(self.notify_mission_state_changed)
         
-    def notify_mission_state_changed(self, data: Optional[dict[int, CollectMissionData]]):
+    def notify_mission_state_changed(self, data: Optional[MissionFamilyState]):
         self.data = CollectMissionData(data)
         self.update_ui()
 
@@ -138,6 +136,9 @@ class CollectUI:
             return
 
         logger.info("Updating UI...")
+        # Watched again by display_row_stats if the Expiry is still displayed
+        expiry_scheduler.unwatch_countdown("collect")
+        self.expiry_label = None
 
         for child in self.frame.winfo_children():
             child.destroy()
@@ -227,16 +228,22 @@ class CollectUI:
         pb["value"] = (float(self.data.delivered_count)/float(self.data.required_count))*100
         self.row_count += 1
 
-    def display_row_stats(self):
+    def get_expiry_label_text(self) -> str:
         min_expiry_text = get_expiry_text(self.data.min_expiry)
         max_expiry_text = get_expiry_text(self.data.max_expiry)
         if min_expiry_text == max_expiry_text:
-            expiry_text = f"Expiry: {max_expiry_text}"
-        else:
-            expiry_text = f"Expiry: {max_expiry_text} <-> {min_expiry_text}"        
-        expiry_label = tk.Label(self.frame, text=expiry_text, foreground="green")
-        expiry_label.grid(row=self.row_count, column=0, columnspan=self.settings.column_count, sticky=tk.W)
+            return f"Expiry: {max_expiry_text}"
+        return f"Expiry: {max_expiry_text} <-> {min_expiry_text}"
+
+    def update_expiry_label(self):
+        if self.expiry_label is not None:
+            self.expiry_label.config(text=self.get_expiry_label_text())
+
+    def display_row_stats(self):
+        self.expiry_label = tk.Label(self.frame, text=self.get_expiry_label_text(), foreground="green")
+        self.expiry_label.grid(row=self.row_count, column=0, columnspan=self.settings.column_count, sticky=tk.W)
         self.row_count += 1
+        expiry_scheduler.watch_countdown("collect", [self.data.min_expiry, self.data.max_expiry], self.update_expiry_label)
         
         reward_rate_text = f"{float(self.data.reward)/1000000/self.data.required_count:.2f}"
         wing_reward_rate_text = f"{float(self.data.shareable_reward)/1000000/self.data.required_count:.2f}"
@@ -1,4 +1,5 @@
 ﻿import json
+import logging
 import tkinter as tk
 from tkinter import ttk
 from tkinter import font
@@ -7,10 +8,12 @@ from dataclasses import dataclass
 from datetime import datetime, timedelta
 
 import ui.settings
-from missions.state import courier_mission_listeners, CourierMission
+from missions.state import courier_mission_listeners, MissionFamilyState
 from ui.settings import Configuration, configuration, settings_ui
 from helpers.logger_factory import logger
 from helpers.ui import get_expiry_text
+from missions.expiry import expiry_scheduler
+from missions.records import get_expiry_datetime
 from theme import theme
 #from helpers.overlay import overlay
 
@@ -26,20 +29,21 @@ class CourierMissionData:
         min_expiry: datetime = None
         max_expiry: datetime = None
         
-    def __init__(self, courier_mission_store: dict[int, CourierMission]):
+    def __init__(self, courier_mission_state: MissionFamilyState):
         self.warnings: list[str] = []
         # if Log Level is set to DEBUG, this will output the current Courier Mission State to the Log File.
         # for easy searching, you can Ctrl+F for "COURIER_MISSION_DATA_INPUT" and get the line below that.
-        logger.debug("CourierMissionData input below: COURIER_MISSION_DATA_INPUT")
-        try:
-            debug_message_state: dict[int, dict] = {}
-            for k in courier_mission_store.keys():
-                v = courier_mission_store[k]
-                debug_message_state[k] = v.as_dict()
-            logger.debug(json.dumps(debug_message_state))
-        except Exception:
-            logger.error("Failed to Log debug_message_state")
-            pass
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("CourierMissionData input below: COURIER_MISSION_DATA_INPUT")
+            try:
+                debug_message_state: dict[int, dict] = {}
+                for k in courier_mission_state.missions.keys():
+                    v = courier_mission_state.missions[k]
+                    debug_message_state[k] = v.as_dict()
+                logger.debug(json.dumps(debug_message_state))
+            except Exception:
+                logger.error("Failed to Log debug_message_state")
+                pass
 
         self.locations: dict[str, CourierMissionData.LocationState] = {}
    
@@ -51,24 +55,17 @@ class CourierMissionData:
         self.min_expiry: datetime = None
         self.max_expiry: datetime = None        
         
-        for mission in courier_mission_store.values():
-            location_required = f"{mission.target_system}\{mission.target_station}"
-            if location_required not in self.locations.keys():
-                self.locations[location_required] = CourierMissionData.LocationState()
-            location_state = self.locations[location_required]
-
-            location_state.mission_count += 1            
-            location_state.required_count += 1
-            location_state.delivered_count += 0 #mission.delivered_count
-            location_state.reward += mission.reward            
-            if mission.is_wing:
-                location_state.shareable_reward += mission.reward
-
-            expiry = datetime.strptime(mission.expiry,"%Y-%m-%dT%H:%M:%SZ")                
-            if location_state.min_expiry is None or expiry < location_state.min_expiry:
-                location_state.min_expiry = expiry                
-            if location_state.max_expiry is None or expiry > location_state.max_expiry:
-                location_state.max_expiry = expiry   
+        # Sums and Expiry range per Location come from the Mission Table aggregates taken on the Journal Worker
+        for location_required, aggregate in courier_mission_state.aggregates.items():
+            self.locations[location_required] = CourierMissionData.LocationState(
+                mission_count=aggregate.mission_count,
+                required_count=aggregate.required_count,
+                delivered_count=aggregate.progress_count,
+                reward=aggregate.reward,
+                shareable_reward=aggregate.shareable_reward,
+                min_expiry=get_expiry_datetime(aggregate.min_expiry),
+                max_expiry=get_expiry_datetime(aggregate.max_expiry)
+            )
                 
         for location_state in self.locations.values():
             self.mission_count += location_state.mission_count
@@ -101,11 +98,13 @@ class CourierUI:
         self.frame: Optional[tk.Frame] = None
         self.data: Optional[CourierMissionData] = None
         self.settings: GridUiSettings = GridUiSettings(configuration)
+        # Expiry of the stats row, the countdown only updates its text
+        self.expiry_label: Optional[tk.Label] = None
 
         settings_ui.configuration_listeners.append(self.notify_settings_changed)
         courier_mission_listeners.append(self.notify_mission_state_changed)
         
-    def notify_mission_state_changed(self, data: Optional[dict[int, CourierMissionData]]):
+    def notify_mission_state_changed(self, data: Optional[MissionFamilyState]):
         self.data = CourierMissionData(data)
         self.update_ui()
 
@@ -136,6 +135,9 @@ class CourierUI:
             return
 
         logger.info("Updating UI...")
+        # Watched again by display_row_stats if the Expiry is still displayed
+        expiry_scheduler.unwatch_countdown("courier")
+        self.expiry_label = None
         
         for child in self.frame.winfo_children():
             child.destroy()
@@ -226,16 +228,22 @@ class CourierUI:
         pb["value"] = (float(self.data.delivered_count)/float(self.data.required_count))*100
         self.row_count += 1
 
-    def display_row_stats(self):
+    def get_expiry_label_text(self) -> str:
         min_expiry_text = get_expiry_text(self.data.min_expiry)
         max_expiry_text = get_expiry_text(self.data.max_expiry)
         if min_expiry_text == max_expiry_text:
-            expiry_text = f"Expiry: {max_expiry_text}"
-        else:
-            expiry_text = f"Expiry: {max_expiry_text} <-> {min_expiry_text}"        
-        expiry_label = tk.Label(self.frame, text=expiry_text, foreground="green")
-        expiry_label.grid(row=self.row_count, column=0, columnspan=self.settings.column_count, sticky=tk.W)
+            return f"Expiry: {max_expiry_text}"
+        return f"Expiry: {max_expiry_text} <-> {min_expiry_text}"
+
+    def update_expiry_label(self):
+        if self.expiry_label is not None:
+            self.expiry_label.config(text=self.get_expiry_label_text())
+
+    def display_row_stats(self):
+        self.expiry_label = tk.Label(self.frame, text=self.get_expiry_label_text(), foreground="green")
+        self.expiry_label.grid(row=self.row_count, column=0, columnspan=self.settings.column_count, sticky=tk.W)
         self.row_count += 1
+        expiry_scheduler.watch_countdown("courier", [self.data.min_expiry, self.data.max_expiry], self.update_expiry_label)
         
         reward_rate_text = f"{float(self.data.reward)/1000000/self.data.required_count:.2f}"
         wing_reward_rate_text = f"{float(self.data.shareable_reward)/1000000/self.data.required_count:.2f}"
@@ -1,8 +1,10 @@
+import queue
 import tkinter as tk
 from tkinter import ttk
-from typing import Optional
+from dataclasses import dataclass
+from typing import Any, Callable, Optional
 
-from missions.state import CollectMission, CourierMission, MassacreMission, MiningMission, collect_mission_listeners, courier_mission_listeners, massacre_mission_listeners, mining_mission_listeners
+from missions.state import MissionFamilyState, collect_mission_listeners, courier_mission_listeners, massacre_mission_listeners, mining_mission_listeners
 from ui.massacre import massacre_ui
 from ui.mining import mining_ui
 from ui.collect import CollectMissionData, collect_ui
@@ -23,28 +25,48 @@ class GridUiSettings:
         self.display_row_stats = config.display_row_stats
         self.debug_mode_enabled = config.debug_mode_enabled
 
+@dataclass
+class MissionTab:
+    # Name of the Mission Family in missions.types
+    mission_type: str
+    title: str
+    ui: Any
+    listeners: list[Callable]
+    # GridUiSettings attribute switching the tab on
+    setting: str
+
+# In the order of the tabs, the first one holding Missions is selected
+_mission_tabs: list[MissionTab] = [
+    MissionTab("collect", "Collect", collect_ui, collect_mission_listeners, "display_missions_collect"),
+    MissionTab("courier", "Courier", courier_ui, courier_mission_listeners, "display_missions_courier"),
+    MissionTab("massacre", "Massacre", massacre_ui, massacre_mission_listeners, "display_missions_massacre"),
+    MissionTab("mining", "Mining", mining_ui, mining_mission_listeners, "display_missions_mining")
+]
+
+# Milliseconds between two looks at the dispatch queue from the Tk Thread. Doubled up to the maximum while it stays empty.
+_dispatch_poll_interval_ms = 50
+_dispatch_max_poll_interval_ms = 250
+
 class MainUI:
     def __init__(self):
         self.frame: Optional[tk.Frame] = None
         self.tabstrip = Optional[ttk.Notebook]
-        self.collect_tab = Optional[tk.Frame]
-        self.courier_tab = Optional[tk.Frame]
-        self.massacre_tab = Optional[tk.Frame]
-        self.mining_tab = Optional[tk.Frame]
+        # Mission Type -> tab, for the tabs enabled in the settings
+        self.tabs: dict[str, tk.Frame] = {}
         
         self.version_info: Optional[VersionInfo] = None
+        self.loading_progress: Optional[tuple[int, int]] = None
+        # Callbacks handed over from worker Threads, run on the Tk Thread as it polls the queue
+        self.dispatch_queue: queue.SimpleQueue[Callable[[], None]] = queue.SimpleQueue()
+        self._dispatch_poll_interval_ms = _dispatch_poll_interval_ms
         self.settings: GridUiSettings = GridUiSettings(configuration)
         
-        self.display_missions_collect = False
-        self.display_missions_courier = False
-        self.display_missions_massacre = False
-        self.display_missions_mining = False
+        # Mission Types having active Missions
+        self.displayed_mission_types: set[str] = set()
         
         settings_ui.configuration_listeners.append(self.notify_settings_changed)
-        collect_mission_listeners.append(self.notify_collect_mission_state_changed)
-        courier_mission_listeners.append(self.notify_courier_mission_state_changed)
-        massacre_mission_listeners.append(self.notify_massacre_mission_state_changed)
-        mining_mission_listeners.append(self.notify_mining_mission_state_changed)
+        for mission_tab in _mission_tabs:
+            mission_tab.listeners.append(lambda data, mission_type=mission_tab.mission_type: self.notify_mission_state_changed(mission_type, data))
 
     def notify_settings_changed(self, config: Configuration):
         self.settings = GridUiSettings(config)
@@ -52,38 +74,50 @@ class MainUI:
         
     def notify_version_info(self, version_info):
         self.version_info = version_info
-        self.frame.event_generate("<<Refresh>>") # type: ignore
-
-    def notify_version_info_ignored(self):
-        self.version_info.status = "Ignored"
         self.update_ui()
-        
-    def notify_collect_mission_state_changed(self, data: dict[int, CollectMission]):
-        if data is None or len(data) == 0:
-            self.display_missions_collect = False
-        else:
-            self.display_missions_collect = True
+
+    def notify_loading_progress(self, scanned_count: int, total_count: int):
+        self.loading_progress = (scanned_count, total_count)
         self.update_ui()
-            
-    def notify_courier_mission_state_changed(self, data: dict[int, CourierMission]):
-        if data is None or len(data) == 0:
-            self.display_missions_courier = False
-        else:
-            self.display_missions_courier = True
+
+    def notify_loading_finished(self):
+        self.loading_progress = None
         self.update_ui()
-            
-    def notify_massacre_mission_state_changed(self, data: dict[int, MassacreMission]):
-        if data is None or len(data) == 0:
-            self.display_missions_massacre = False
+
+    def dispatch(self, callback: Callable[[], None]):
+        # Only queued. Calling Tk from another Thread blocks that Thread until the Tk loop gets to it,
+        # which stalls the Journal Worker for good while plugin_stop holds the Tk Thread joining it.
+        self.dispatch_queue.put(callback)
+
+    def process_dispatch_queue(self) -> bool:
+        processed = False
+        while not self.dispatch_queue.empty():
+            callback = self.dispatch_queue.get_nowait()
+            processed = True
+            try:
+                callback()
+            except Exception as ex:
+                logger.error("Dispatched callback failed", exc_info=ex)
+        return processed
+
+    def poll_dispatch_queue(self):
+        if self.process_dispatch_queue():
+            self._dispatch_poll_interval_ms = _dispatch_poll_interval_ms
         else:
-            self.display_missions_massacre = True
+            # Nothing to do, look less often until something is dispatched again
+            self._dispatch_poll_interval_ms = min(self._dispatch_poll_interval_ms * 2, _dispatch_max_poll_interval_ms)
+        if self.frame is not None:
+            self.frame.after(self._dispatch_poll_interval_ms, self.poll_dispatch_queue)
+
+    def notify_version_info_ignored(self):
+        self.version_info.status = "Ignored"
         self.update_ui()
-            
-    def notify_mining_mission_state_changed(self, data: dict[int, MiningMission]):
-        if data is None or len(data) == 0:
-            self.display_missions_mining = False
+        
+    def notify_mission_state_changed(self, mission_type: str, data: Optional[MissionFamilyState]):
+        if data is None or len(data.missions) == 0:
+            self.displayed_mission_types.discard(mission_type)
         else:
-            self.display_missions_mining = True
+            self.displayed_mission_types.add(mission_type)
         self.update_ui()
         
     def set_frame(self, parent: ttk.Frame):
@@ -96,6 +130,8 @@ class MainUI:
         self.frame.bind("<<Refresh>>", lambda _: self.update_ui())
         self.set_tabs() # don't need to refresh this in update_ui as it's content is
         self.update_ui()
+        # Runs anything dispatched before the frame existed and keeps polling from then on
+        self.poll_dispatch_queue()
         return parent
 
     def update_ui(self):
@@ -109,14 +145,11 @@ class MainUI:
             if child.widgetName != "ttk::notebook": # don't destroy the tabs
                 child.destroy()
 
-        if self.display_missions_collect:
-            self.tabstrip.select(self.collect_tab)
-        elif self.display_missions_courier:
-            self.tabstrip.select(self.courier_tab)
-        elif self.display_missions_massacre:
-            self.tabstrip.select(self.massacre_tab)
-        elif self.display_missions_mining:
-            self.tabstrip.select(self.mining_tab)
+        displayed_tab = next((self.tabs[mission_type] for mission_type in self.tabs.keys() if mission_type in self.displayed_mission_types), None)
+        if displayed_tab is not None:
+            self.tabstrip.select(displayed_tab)
+        elif self.loading_progress is not None:
+            self.display_loading_progress()
         else:
             self.display_no_missions_data()            
             
@@ -127,18 +160,11 @@ class MainUI:
 
     def set_tabs(self):
         self.tabstrip = ttk.Notebook(self.frame)
-        if self.settings.display_missions_collect:
-            self.collect_tab = collect_ui.set_frame(self.tabstrip)  
-            self.tabstrip.add(self.collect_tab, text="Collect [0]")
-        if self.settings.display_missions_courier:
-            self.courier_tab = courier_ui.set_frame(self.tabstrip)      
-            self.tabstrip.add(self.courier_tab, text="Courier [0]")
-        if self.settings.display_missions_massacre:
-            self.massacre_tab = massacre_ui.set_frame(self.tabstrip)    
-            self.tabstrip.add(self.massacre_tab, text="Massacre [0]")            
-        if self.settings.display_missions_mining:
-            self.mining_tab = mining_ui.set_frame(self.tabstrip)    
-            self.tabstrip.add(self.mining_tab, text="Mining [0]")
+        self.tabs = {}
+        for mission_tab in _mission_tabs:
+            if getattr(self.settings, mission_tab.setting):
+                self.tabs[mission_tab.mission_type] = mission_tab.ui.set_frame(self.tabstrip)
+                self.tabstrip.add(self.tabs[mission_tab.mission_type], text=f"{mission_tab.title} [0]")
 
         self.tabstrip.pack(expand=True, fill="both") 
         
@@ -150,6 +176,17 @@ class MainUI:
         no_data_frame.pack()
         theme.update(no_data_frame)
         
+    def display_loading_progress(self):
+        scanned_count, total_count = self.loading_progress
+        loading_frame = tk.Frame(self.frame)
+        loading_label = tk.Label(loading_frame, text=f"Loading Journals... {scanned_count}/{total_count}")
+        loading_label.pack()
+        loading_progressbar = ttk.Progressbar(loading_frame, orient="horizontal", mode="determinate", length=300)
+        loading_progressbar.pack(padx=3, pady=1, ipady=1)
+        loading_progressbar["value"] = (float(scanned_count)/float(max(total_count, 1)))*100
+        loading_frame.pack()
+        theme.update(loading_frame)
+
     def display_version_info(self) -> int:
         if self.version_info.status.lower() == "outdated":
             version_info_text = f"Version {self.version_info.current}<{self.version_info.latest} {self.version_info.status}"
@@ -1,4 +1,5 @@
 import json
+import logging
 import tkinter as tk
 from tkinter import ttk
 from tkinter import font
@@ -6,10 +7,12 @@ from typing import Optional
 from dataclasses import dataclass
 from datetime import datetime, timedelta
 
-from missions.state import massacre_mission_listeners, MassacreMission
+from missions.state import massacre_mission_listeners, MissionFamilyState
 from ui.settings import Configuration, configuration, settings_ui
 from helpers.logger_factory import logger
 from helpers.ui import get_expiry_text
+from missions.expiry import expiry_scheduler
+from missions.records import get_expiry_datetime
 from theme import theme
 #from helpers.overlay import overlay
 
@@ -25,24 +28,26 @@ class MassacreMissionData:
         min_expiry: datetime = None
         max_expiry: datetime = None
         
-    def __init__(self, massacre_mission_store: dict[int, MassacreMission]):
+    def __init__(self, massacre_mission_state: MissionFamilyState):
         self.warnings: list[str] = []
         # if Log Level is set to DEBUG, this will output the current Massacre Mission State to the Log File.
         # for easy searching, you can Ctrl+F for "MASSACRE_MISSION_DATA_INPUT" and get the line below that.
-        logger.debug("MassacreMissionData input below: MASSACRE_MISSION_DATA_INPUT")
-        try:
-            debug_message_state: dict[int, dict] = {}
-            for k in massacre_mission_store.keys():
-                v = massacre_mission_store[k]
-                debug_message_state[k] = v.as_dict()
-            logger.debug(json.dumps(debug_message_state))
-        except Exception:
-            logger.error("Failed to Log debug_message_state")
-            pass
-
-        target_factions: list[str] = []
-        target_types: list[str] = []
-        target_systems: list[str] = []
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("MassacreMissionData input below: MASSACRE_MISSION_DATA_INPUT")
+            try:
+                debug_message_state: dict[int, dict] = {}
+                for k in massacre_mission_state.missions.keys():
+                    v = massacre_mission_state.missions[k]
+                    debug_message_state[k] = v.as_dict()
+                logger.debug(json.dumps(debug_message_state))
+            except Exception:
+                logger.error("Failed to Log debug_message_state")
+                pass
+
+        # Distinct targets are counted by the Mission Table as Missions come and go
+        target_factions: list[str] = massacre_mission_state.attribute_values.get("target_faction", [])
+        target_types: list[str] = massacre_mission_state.attribute_values.get("target_type", [])
+        target_systems: list[str] = massacre_mission_state.attribute_values.get("target_system", [])
         self.factions: dict[str, MassacreMissionData.FactionState] = {}
 
         self.mission_count: int = 0
@@ -53,33 +58,17 @@ class MassacreMissionData:
         self.min_expiry: datetime = None
         self.max_expiry: datetime = None        
 
-        for mission in massacre_mission_store.values():
-            faction = mission.source_faction
-            if faction not in self.factions.keys():
-                self.factions[faction] = MassacreMissionData.FactionState()
-            faction_state = self.factions[faction]
-
-            faction_state.mission_count += 1            
-            faction_state.victim_count += mission.victim_count
-            faction_state.kill_count += mission.kill_count
-            faction_state.reward += mission.reward            
-            if mission.is_wing:
-                faction_state.shareable_reward += mission.reward
-
-            expiry = datetime.strptime(mission.expiry,"%Y-%m-%dT%H:%M:%SZ")                
-            if faction_state.min_expiry is None or expiry < faction_state.min_expiry:
-                faction_state.min_expiry = expiry                
-            if faction_state.max_expiry is None or expiry > faction_state.max_expiry:
-                faction_state.max_expiry = expiry         
-
-            if mission.target_faction not in target_factions:
-                target_factions.append(mission.target_faction)
-
-            if mission.target_type not in target_types:
-                target_types.append(mission.target_type)
-
-            if mission.target_system not in target_systems:
-                target_systems.append(mission.target_system)
+        # Sums and Expiry range per Source Faction come from the Mission Table aggregates taken on the Journal Worker
+        for faction, aggregate in massacre_mission_state.aggregates.items():
+            self.factions[faction] = MassacreMissionData.FactionState(
+                mission_count=aggregate.mission_count,
+                kill_count=aggregate.required_count,
+                victim_count=aggregate.progress_count,
+                reward=aggregate.reward,
+                shareable_reward=aggregate.shareable_reward,
+                min_expiry=get_expiry_datetime(aggregate.min_expiry),
+                max_expiry=get_expiry_datetime(aggregate.max_expiry)
+            )
 
         # After all Missions have been handled, iterate through the faction_to_count_lookup to calculate the Total Rewards   
         for faction_state in self.factions.values():
@@ -117,11 +106,13 @@ class MassacreUI:
         self.frame: Optional[tk.Frame] = None
         self.data: Optional[MassacreMissionData] = None
         self.settings: GridUiSettings = GridUiSettings(configuration)
+        # Expiry of the stats row, the countdown only updates its text
+        self.expiry_label: Optional[tk.Label] = None
 
         settings_ui.configuration_listeners.append(self.notify_settings_changed)
         massacre_mission_listeners.append(self.notify_mission_state_changed)
         
-    def notify_mission_state_changed(self, data: Optional[dict[int, MassacreMissionData]]):
+    def notify_mission_state_changed(self, data: Optional[MissionFamilyState]):
         self.data = MassacreMissionData(data)
         self.update_ui()
 
@@ -152,6 +143,9 @@ class MassacreUI:
             return
 
         logger.info("Updating UI...")
+        # Watched again by display_row_stats if the Expiry is still displayed
+        expiry_scheduler.unwatch_countdown("massacre")
+        self.expiry_label = None
         
         for child in self.frame.winfo_children():
             child.destroy()
@@ -242,16 +236,22 @@ class MassacreUI:
         pb["value"] = (float(self.data.victim_count)/float(self.data.kill_count))*100    
         self.row_count += 1
         
-    def display_row_stats(self):
+    def get_expiry_label_text(self) -> str:
         min_expiry_text = get_expiry_text(self.data.min_expiry)
         max_expiry_text = get_expiry_text(self.data.max_expiry)
         if min_expiry_text == max_expiry_text:
-            expiry_text = f"Expiry: {max_expiry_text}"
-        else:
-            expiry_text = f"Expiry: {max_expiry_text} <-> {min_expiry_text}"        
-        expiry_label = tk.Label(self.frame, text=expiry_text, foreground="green")
-        expiry_label.grid(row=self.row_count, column=0, columnspan=self.settings.column_count, sticky=tk.W)
+            return f"Expiry: {max_expiry_text}"
+        return f"Expiry: {max_expiry_text} <-> {min_expiry_text}"
+
+    def update_expiry_label(self):
+        if self.expiry_label is not None:
+            self.expiry_label.config(text=self.get_expiry_label_text())
+
+    def display_row_stats(self):
+        self.expiry_label = tk.Label(self.frame, text=self.get_expiry_label_text(), foreground="green")
+        self.expiry_label.grid(row=self.row_count, column=0, columnspan=self.settings.column_count, sticky=tk.W)
         self.row_count += 1
+        expiry_scheduler.watch_countdown("massacre", [self.data.min_expiry, self.data.max_expiry], self.update_expiry_label)
         
         reward_rate_text = f"{float(self.data.reward)/1000000/self.data.kill_count:.2f}"
         wing_reward_rate_text = f"{float(self.data.shareable_reward)/1000000/self.data.kill_count:.2f}"
@@ -92,6 +92,34 @@ class Configuration:
     @process_journal_weeks.setter
     def process_journal_weeks(self, value: int):
         config.set(f"{self.plugin_name}.process_journal_weeks", value)
+
+    @property
+    def journal_worker_count(self):
+        return config.get_int(f"{self.plugin_name}.journal_worker_count", default=4)
+    @journal_worker_count.setter
+    def journal_worker_count(self, value: int):
+        config.set(f"{self.plugin_name}.journal_worker_count", value)
+
+    @property
+    def mission_archive_size(self):
+        return config.get_int(f"{self.plugin_name}.mission_archive_size", default=0)
+    @mission_archive_size.setter
+    def mission_archive_size(self, value: int):
+        config.set(f"{self.plugin_name}.mission_archive_size", value)
+
+    @property
+    def event_coalesce_window_ms(self):
+        return config.get_int(f"{self.plugin_name}.event_coalesce_window_ms", default=250)
+    @event_coalesce_window_ms.setter
+    def event_coalesce_window_ms(self, value: int):
+        config.set(f"{self.plugin_name}.event_coalesce_window_ms", value)
+
+    @property
+    def event_coalesce_batch_size(self):
+        return config.get_int(f"{self.plugin_name}.event_coalesce_batch_size", default=50)
+    @event_coalesce_batch_size.setter
+    def event_coalesce_batch_size(self, value: int):
+        config.set(f"{self.plugin_name}.event_coalesce_batch_size", value)
         
 class SettingsUI:
 
@@ -125,6 +153,14 @@ class SettingsUI:
             configuration.overlay_ttl = self.setting_changes['overlay_ttl'].get()
         if "process_journal_weeks" in keys:
             configuration.process_journal_weeks = self.setting_changes["process_journal_weeks"].get()
+        if "journal_worker_count" in keys:
+            configuration.journal_worker_count = self.setting_changes["journal_worker_count"].get()
+        if "mission_archive_size" in keys:
+            configuration.mission_archive_size = self.setting_changes["mission_archive_size"].get()
+        if "event_coalesce_window_ms" in keys:
+            configuration.event_coalesce_window_ms = self.setting_changes["event_coalesce_window_ms"].get()
+        if "event_coalesce_batch_size" in keys:
+            configuration.event_coalesce_batch_size = self.setting_changes["event_coalesce_batch_size"].get()
             
         for listener in self.configuration_listeners:
             listener(configuration)
@@ -147,6 +183,10 @@ class SettingsUI:
         self.setting_changes["overlay_enabled"] = tk.IntVar(value=configuration.overlay_enabled)    
         self.setting_changes["overlay_ttl"] = tk.IntVar(value=configuration.overlay_ttl)
         self.setting_changes["process_journal_weeks"] = tk.IntVar(value=configuration.process_journal_weeks)
+        self.setting_changes["journal_worker_count"] = tk.IntVar(value=configuration.journal_worker_count)
+        self.setting_changes["mission_archive_size"] = tk.IntVar(value=configuration.mission_archive_size)
+        self.setting_changes["event_coalesce_window_ms"] = tk.IntVar(value=configuration.event_coalesce_window_ms)
+        self.setting_changes["event_coalesce_batch_size"] = tk.IntVar(value=configuration.event_coalesce_batch_size)
 
         row_count = 0
         nb.Label(frame, text="Display Mission Tabs (Requires Restart)", pady=10).grid(row=row_count, sticky=tk.W, padx=title_offset)
@@ -197,6 +237,30 @@ class SettingsUI:
         nb.Entry(frame, textvariable=self.setting_changes["process_journal_weeks"])\
             .grid(row=row_count, column=1, sticky=tk.W)        
         row_count += 1
+
+        nb.Label(frame, text="Journal Worker Threads")\
+            .grid(row=row_count, column=0, padx=checkbox_offset, sticky=tk.W)
+        nb.Entry(frame, textvariable=self.setting_changes["journal_worker_count"])\
+            .grid(row=row_count, column=1, sticky=tk.W)
+        row_count += 1
+
+        nb.Label(frame, text="Finished Missions Archive Size")\
+            .grid(row=row_count, column=0, padx=checkbox_offset, sticky=tk.W)
+        nb.Entry(frame, textvariable=self.setting_changes["mission_archive_size"])\
+            .grid(row=row_count, column=1, sticky=tk.W)
+        row_count += 1
+
+        nb.Label(frame, text="Update Batching Window (ms, 0 = Idle)")\
+            .grid(row=row_count, column=0, padx=checkbox_offset, sticky=tk.W)
+        nb.Entry(frame, textvariable=self.setting_changes["event_coalesce_window_ms"])\
+            .grid(row=row_count, column=1, sticky=tk.W)
+        row_count += 1
+
+        nb.Label(frame, text="Update Batching Max Changes")\
+            .grid(row=row_count, column=0, padx=checkbox_offset, sticky=tk.W)
+        nb.Entry(frame, textvariable=self.setting_changes["event_coalesce_batch_size"])\
+            .grid(row=row_count, column=1, sticky=tk.W)
+        row_count += 1
         
         nb.Label(frame, text="", pady=10).grid(row=row_count)     
 